@@ -3,12 +3,13 @@ import json
 import streamlit as st
 from datetime import datetime, timedelta
 import locale
-from streamlit import cache_data
 
 from services.email_service import EmailService
-from clients.github_client import GitHubClient
+from clients.content_storage import get_storage
 from clients.email_client import EmailClient
 from services.email_indexer import EmailIndexer
+from services.metadata_sync import MetadataSync
+from data.metadata_store import MetadataStore
 
 # Chargement de la locale française
 try:
@@ -16,32 +17,47 @@ try:
 except:
     pass
 
+st.set_page_config(page_title="Recherche Emails", layout="wide")
+st.title("📬 Recherche dans les Emails (Index GitHub)")
+
 # Initialisation des services
-github = GitHubClient()
+github = get_storage()
 email_client = EmailClient()
-service = EmailService(github=github, email_client=email_client, context="MH")
 indexer = EmailIndexer(github=github, context="MH")
 
-st.set_page_config(page_title="Recherche Emails", layout="wide")
-st.title("📬 Recherche dans les Emails (Index GitHub)")
+@st.cache_resource
+def get_metadata():
+    # Copie SQLite locale partagée par les sessions ; les modifications partent vers GitHub en arrière-plan
+    metadata = MetadataSync(MetadataStore(), indexer)
+    try:
+        metadata.pull(include_bodies=metadata.store.count() == 0)
+    except Exception as e:
+        # Index illisible : on travaille sur la copie locale telle quelle
+        print(f"[WARN] Index GitHub illisible, copie locale conservée : {e}")
+    metadata.start()
+    return metadata
 
-# Rafraîchissement manuel
-if st.button("🔄 Rafraîchir l’index"):
-    indexer.run()
-    cache_data.clear()
-    st.success("Index mis à jour à partir des fichiers Markdown.")
-    st.rerun()
+metadata = get_metadata()
+service = EmailService(github=github, email_client=email_client, context="MH", metadata=metadata)
 
-@st.cache_data
-def load_index():
+# Rafraîchissement manuel (incrémental : seuls les fichiers modifiés sont relus)
+reconstruction_complete = st.checkbox("Reconstruction complète", value=False)
+if st.button("🔄 Rafraîchir l’index"):
+    indexer.run(full=reconstruction_complete)
     try:
-        return service.get_index()
+        metadata.pull(include_bodies=True)
     except Exception as e:
-        st.error(f"Erreur lors du chargement de l’index : {e}")
-        return []
+        st.error(f"❌ Index illisible, copie locale conservée : {e}")
+    else:
+        st.success("Index mis à jour à partir des fichiers Markdown.")
+        st.rerun()
 
 def format_date_humaine(date_str):
-    dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+    # Les transcriptions dont la date n’a pas pu être lue sont indexées sans date
+    try:
+        dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return "Date inconnue"
     now = datetime.now()
     if dt.date() == now.date():
         return f"Aujourd’hui à {dt.strftime('%Hh%M')}"
@@ -53,35 +69,15 @@ def format_date_humaine(date_str):
     else:
         return dt.strftime('%A %d %B à %Hh%M').capitalize()
 
-def search_emails(query, index):
-    terms = query.lower().split()
-    results = []
-    for item in index:
-        searchable = " ".join([
-            item.get("title", ""),
-            item.get("author", ""),
-            item.get("date", ""),
-            item.get("summary", ""),
-            " ".join(item.get("recipients", [])),
-            item.get("file", "")
-        ]).lower()
-        if all(term in searchable for term in terms):
-            results.append(item)
-    return results
-
-# Chargement de l'index
-index = load_index()
+# Recherche plein texte et filtrage servis par la copie SQLite locale
 query = st.text_input("💡 Posez une question ou entrez un mot-clé", "")
 afficher_archives = st.checkbox("Inclure les emails archivés", value=False)
 
-# Filtrage
 if query:
-    results = search_emails(query, index)
-    if not afficher_archives:
-        results = [r for r in results if r.get("status") != "archive"]
+    results = metadata.store.search(query, include_archived=afficher_archives, context="MH")
     st.markdown(f"### 🔎 {len(results)} résultat(s) trouvé(s)")
 else:
-    results = [r for r in index if r.get("status") != "archive" or afficher_archives]
+    results = metadata.store.query(context="MH", include_archived=afficher_archives)
     st.markdown(f"### 📁 {len(results)} email(s) affiché(s)")
 
 # Tri
@@ -99,7 +95,7 @@ for r in results:
         c1, c2, c3, c4 = st.columns([1.3, 2.5, 6, 1.2])
 
         # Date
-        c1.markdown(f"🕒 {format_date_humaine(r['date'])}")
+        c1.markdown(f"🕒 {format_date_humaine(r.get('date'))}")
 
         # Auteur + destinataires condensés
         destinataires = r.get("recipients", [])
@@ -113,12 +109,12 @@ for r in results:
                 destinataires_line = visible
         else:
             destinataires_line = "_Aucun destinataire_"
-        c2.markdown(f"👤 {r['author']}")
+        c2.markdown(f"👤 {r.get('author') or r.get('source') or 'Auteur inconnu'}")
         c2.markdown(f"✉️ _{destinataires_line}_")
 
         # Sujet + résumé complet ou avec expander
         titre = r.get("title", "(Sans titre)")
-        resume = r.get("summary", "*Résumé non disponible*")
+        resume = r.get("summary") or "*Résumé non disponible*"
         if len(resume) > 300:
             c3.markdown(f"**{titre}**")
             with c3.expander("Voir le résumé complet"):
@@ -127,14 +123,13 @@ for r in results:
             c3.markdown(f"**{titre}** · {resume}")
 
         # Actions : lien et archive
-        mail_url = f"https://github.com/helie-co/content/blob/main/{r['file']}"
+        mail_url = github.blob_url(r['file'])
         c4.markdown(f"[📨 Voir le mail]({mail_url})")
 
         if r.get("status") != "archive":
             if c4.button("📦 Archiver", key=f"archiver-{r['id']}"):
                 try:
-                    service.archive_email_by_id(r["id"])
-                    cache_data.clear()
+                    service.archive_email_by_id(r.get("entry_id") or r["id"])
                     st.success(f"Email archivé avec succès : {r['title']}")
                     st.rerun()
                 except Exception as e:
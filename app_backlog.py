@@ -2,13 +2,13 @@ import streamlit as st
 import pandas as pd
 import json
 import streamlit.components.v1 as components
-from clients.github_client import GitHubClient
+from clients.content_storage import get_storage
 from data.action import Action
 
 st.set_page_config(page_title="📋 Backlog des actions", layout="wide")
 st.title("📋 Backlog des actions extraites")
 
-github = GitHubClient()
+github = get_storage()
 backlog_path = "MH/backlog.json"
 
 @st.cache_data
@@ -33,7 +33,7 @@ else:
 
     # 🔍 Lien GitHub cliquable
     df["🔍"] = df["source"].apply(
-        lambda path: f'<a href="https://github.com/{github.owner}/{github.repo}/blob/{github.branch}/{path}" target="_blank">🔍</a>'
+        lambda path: f'<a href="{github.blob_url(path)}" target="_blank">🔍</a>'
     )
 
     # ✅ Marquer comme "terminée" (client-side seulement)
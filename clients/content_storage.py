@@ -0,0 +1,116 @@
+import os
+import hashlib
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+
+
+class ConflictError(RuntimeError):
+    """Écriture conditionnelle refusée : un fichier a changé depuis sa lecture."""
+
+
+class ContentStorage(ABC):
+    """
+    Interface commune au dépôt de contenu (emails, transcriptions, index, backlog).
+    Implémentations : GitHubClient (API REST) et LocalGitClient (copie de travail git locale).
+    """
+
+    owner: str
+    repo: str
+    branch: str
+
+    @abstractmethod
+    def get_file(self, path: str) -> str:
+        ...
+
+    @abstractmethod
+    def upload_file(self, path: str, content: str, commit_message: str):
+        ...
+
+    @abstractmethod
+    def delete_file(self, path: str, commit_message: str):
+        ...
+
+    @abstractmethod
+    def list_files(self, path: str) -> list[str]:
+        ...
+
+    @abstractmethod
+    def list_tree(self, prefix: str = "") -> dict:
+        ...
+
+    @abstractmethod
+    def upload_files(self, files: dict, commit_message: str = "Commit multiple files"):
+        ...
+
+    @abstractmethod
+    def commit_files(self, files: dict, commit_message: str, deletions=None, expected_shas: dict = None):
+        """
+        Écrit et supprime des fichiers en un seul commit. Avec expected_shas ({chemin: SHA de blob,
+        ou None si le fichier ne doit pas exister}), le commit n'a lieu que si ces fichiers n'ont pas
+        changé depuis leur lecture ; sinon ConflictError est levée et rien n'est écrit.
+        """
+        ...
+
+    @abstractmethod
+    def batch(self, commit_message: str = "Commit multiple files"):
+        ...
+
+    def get_files(self, paths, max_workers: int = 8):
+        """
+        Lit plusieurs fichiers et produit des tuples (chemin, contenu, erreur) au fil de l'eau :
+        l'erreur est None en cas de succès, le contenu est None en cas d'échec.
+        """
+        for path in paths:
+            try:
+                yield path, self.get_file(path), None
+            except Exception as e:
+                yield path, None, e
+
+    def read_prefixes(self, prefixes: list[str], suffix: str = ""):
+        """
+        Lit tous les fichiers sous les préfixes donnés (filtrés par suffixe) et produit des tuples
+        (chemin, contenu, erreur) comme get_files.
+        """
+        paths = [path for prefix in prefixes for path in self.list_tree(prefix) if path.endswith(suffix)]
+        yield from self.get_files(paths)
+
+    def iter_snapshot(self, prefixes: list[str], paths=None, suffix: str = ""):
+        """
+        Produit les tuples (chemin, contenu, erreur) de l'état courant des préfixes donnés,
+        restreints à `paths` s'ils sont donnés.
+        """
+        wanted = set(paths) if paths is not None else None
+        for path, content, error in self.read_prefixes(prefixes, suffix):
+            if wanted is None or path in wanted:
+                yield path, content, error
+
+    def get_file_shas(self, prefix: str = "") -> dict[str, str]:
+        return {path: entry["sha"] for path, entry in self.list_tree(prefix).items()}
+
+    def sync(self):
+        """Synchronise le stockage avec le dépôt distant (sans effet pour l'API GitHub)."""
+
+    def blob_url(self, path: str) -> str:
+        return f"https://github.com/{self.owner}/{self.repo}/blob/{self.branch}/{path}"
+
+
+def git_blob_sha(content: bytes) -> str:
+    """SHA-1 d'un blob git, identique à `git hash-object`."""
+    header = f"blob {len(content)}\0".encode("utf-8")
+    return hashlib.sha1(header + content).hexdigest()
+
+
+def get_storage() -> ContentStorage:
+    """
+    Instancie le stockage choisi par CONTENT_BACKEND : "github" (défaut) ou "local"
+    (copie de travail indiquée par CONTENT_REPO_PATH).
+    """
+    load_dotenv()
+    backend = os.getenv("CONTENT_BACKEND", "github").lower()
+    if backend == "github":
+        from clients.github_client import GitHubClient
+        return GitHubClient()
+    if backend == "local":
+        from clients.local_git_client import LocalGitClient
+        return LocalGitClient()
+    raise ValueError(f"CONTENT_BACKEND inconnu : {backend} (attendu : github ou local)")
@@ -1,14 +1,24 @@
 import os
 from dotenv import load_dotenv
 from data.email_message import EmailMessage
+from clients.outlook_watermark import WatermarkStore, is_before_watermark, watermark_time
 import win32com.client
 import pythoncom
 from datetime import datetime
 
+# Format des dates dans les filtres Items.Restrict (dépend des paramètres régionaux d’Outlook)
+RESTRICT_DATE_FORMAT = os.getenv("OUTLOOK_RESTRICT_DATE_FORMAT", "%d/%m/%Y %H:%M")
+
+
 class EmailClient:
-    def __init__(self, account_name: str = None):
+    def __init__(self, account_name: str = None, watermark_path: str = None):
         load_dotenv()
         self.account_name = account_name or os.getenv("OUTLOOK_ACCOUNT")
+        # Dernier email synchronisé par compte (ReceivedTime + EntryID), pour les synchronisations incrémentales
+        self.watermark_path = watermark_path or os.getenv(
+            "OUTLOOK_WATERMARK_PATH", os.path.join(".cache", "outlook_watermarks.json")
+        )
+        self.watermarks = WatermarkStore(self.watermark_path)
 
     def connect_inbox(self):
         pythoncom.CoInitialize()
@@ -18,16 +28,30 @@ class EmailClient:
                 return account.Folders["Boîte de réception"], account.Folders["Archive"]
         raise Exception(f"Compte Outlook '{self.account_name}' introuvable.")
 
-    def fetch_emails(self, limit=None, source_folder="inbox"):
+    def fetch_emails(self, limit=None, source_folder="inbox", since: dict = None):
+        """
+        Sans `since` : les `limit` emails les plus récents.
+        Avec un watermark `since` ({"received_time", "entry_id"}) : seuls les emails reçus après,
+        du plus ancien au plus récent, filtrés côté Outlook par Items.Restrict. Les messages déjà
+        vus (le watermark lui-même, ou reçus strictement avant) sont écartés sans être analysés.
+        """
         inbox, _ = self.connect_inbox()
         items = inbox.Items
-        items.Sort("[ReceivedTime]", True)
+        if since:
+            watermark = watermark_time(since)
+            # Restrict ne descend pas sous la minute : on repart de la minute du watermark
+            items = items.Restrict(f"[ReceivedTime] >= '{watermark.strftime(RESTRICT_DATE_FORMAT)}'")
+            items.Sort("[ReceivedTime]", False)
+        else:
+            items.Sort("[ReceivedTime]", True)
         emails = []
         count = 0
         for message in items:
             if limit and count >= limit:
                 break
             try:
+                if since and is_before_watermark(message.ReceivedTime, message.EntryID, since):
+                    continue
                 email_msg = self._parse_message(message, source_folder)
                 emails.append(email_msg)
                 count += 1
@@ -35,6 +59,13 @@ class EmailClient:
                 print(f"Erreur lors du traitement d'un e-mail : {e}")
         return emails
 
+    def load_watermark(self):
+        return self.watermarks.load(self.account_name)
+
+    def save_watermark(self, email: EmailMessage):
+        """Enregistre `email` comme dernier email synchronisé pour ce compte."""
+        self.watermarks.save(self.account_name, email.date, email.entry_id)
+
     def count_total_emails(self, source_folder="inbox"):
         inbox, _ = self.connect_inbox()
         items = inbox.Items
@@ -147,7 +178,9 @@ class EmailClient:
             date=date,
             sender=sender,
             recipients=recipients,
-            source=source_folder
+            source=source_folder,
+            entry_id=getattr(message, "EntryID", None),
+            message_id=self._get_internet_message_id(message)
         )
 
     def _clean_subject(self, subject):
@@ -172,6 +205,13 @@ class EmailClient:
             pass
         return "Expéditeur inconnu"
 
+    def _get_internet_message_id(self, msg):
+        try:
+            # PR_INTERNET_MESSAGE_ID : identique quel que soit le dossier ou la boîte
+            return msg.PropertyAccessor.GetProperty("http://schemas.microsoft.com/mapi/proptag/0x1035001F") or None
+        except Exception:
+            return None
+
     def _extract_recipients(self, msg):
         dest = []
         try:
@@ -1,52 +1,351 @@
 import os
+import time
 import base64
-import requests
 import json
+import hashlib
+import tarfile
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
 from dotenv import load_dotenv
+from clients.content_storage import ConflictError, ContentStorage, git_blob_sha
+from clients.github_session import GitHubSession
+from utils.disk_cache import DiskCache
 
+RAW_MEDIA_TYPE = "application/vnd.github.raw+json"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
-class GitHubClient:
-    def __init__(self):
+
+class GitHubClient(ContentStorage):
+    def __init__(
+        self,
+        max_staged_bytes: int = 5 * 1024 * 1024,
+        flush_interval: float = 300.0,
+        http: GitHubSession = None,
+        cache: DiskCache = None
+    ):
         load_dotenv()
         self.token = os.getenv("GITHUB_TOKEN")
         self.owner = os.getenv("GITHUB_OWNER")
         self.repo = os.getenv("GITHUB_REPO")
         self.branch = os.getenv("GITHUB_BRANCH", "main")
         self.api_base = "https://api.github.com"
-        self.base_url = f"{self.api_base}/repos/{self.owner}/{self.repo}/contents"
+        self.repo_url = f"{self.api_base}/repos/{self.owner}/{self.repo}"
+        self.base_url = f"{self.repo_url}/contents"
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Accept": "application/vnd.github+json"
         }
+        # Transport partagé par toutes les méthodes : keep-alive, retries, budget de rate limit
+        self.http = http or GitHubSession(headers=self.headers)
+        # Écritures différées : vidées en un seul commit (taille ou ancienneté dépassée, ou fin de lot)
+        self.max_staged_bytes = max_staged_bytes
+        self.flush_interval = flush_interval
         self._staging_area = {}
+        self._staged_deletions = set()
+        self._staged_bytes = 0
+        self._staged_since = None
+        self._batch_depth = 0
+        self._batch_message = None
+        # Cache local des blobs (clé = SHA git) et ETags pour les requêtes conditionnelles
+        cache_dir = os.getenv("GITHUB_CACHE_DIR", os.path.join(".cache", "github"))
+        cache_max_mb = int(os.getenv("GITHUB_CACHE_MAX_MB", "200"))
+        self.cache = cache or DiskCache(os.path.join(cache_dir, "blobs"), max_bytes=cache_max_mb * 1024 * 1024)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._etags_path = os.path.join(cache_dir, "etags.json")
+        self._etags = self._load_etags()
+        self._etags_dirty = False
+        self._bulk_reads = 0
+        # SHA distant de chaque fichier (listing, lecture, écriture) et instant où il a été relevé :
+        # au-delà de known_sha_ttl secondes, il n'est plus tenu pour l'état courant de la branche
+        self._known_shas = {}
+        self._known_at = {}
+        self.known_sha_ttl = float(os.getenv("GITHUB_KNOWN_SHA_TTL", "5"))
+        self.metrics = {"cache_hits": 0, "not_modified": 0, "downloads": 0, "skipped_writes": 0}
+        # Au-delà de ce nombre de fichiers, get_files passe par des lots GraphQL
+        self.graphql_threshold = int(os.getenv("GITHUB_GRAPHQL_THRESHOLD", "20"))
+        # Au-delà de ce nombre de fichiers absents du cache, read_prefixes télécharge l'archive
+        self.snapshot_threshold = int(os.getenv("GITHUB_SNAPSHOT_THRESHOLD", "500"))
+        self._lock = threading.Lock()
 
     def upload_file(self, path, content, commit_message):
+        if self._batch_depth:
+            self.stage_file(path, content)
+            return {"path": path, "staged": True}
+
+        encoded = content.encode("utf-8")
+        local_sha = git_blob_sha(encoded)
+        if self._known_sha(path) == local_sha:
+            self._count("skipped_writes")
+            return {"path": path, "skipped": True}
+
         url = f"{self.base_url}/{path}"
-        response = requests.get(url, headers=self.headers, params={"ref": self.branch})
+        response = self.http.get(url, params={"ref": self.branch})
         sha = response.json()["sha"] if response.status_code == 200 else None
+        if sha == local_sha:
+            # Contenu identique au blob distant : pas de commit vide
+            self._count("skipped_writes")
+            self._remember_blob(path, sha, encoded)
+            return {"path": path, "skipped": True}
 
         data = {
             "message": commit_message,
             "branch": self.branch,
-            "content": base64.b64encode(content.encode("utf-8")).decode("utf-8"),
+            "content": base64.b64encode(encoded).decode("utf-8"),
         }
         if sha:
             data["sha"] = sha
 
-        put_response = requests.put(url, headers=self.headers, json=data)
+        put_response = self.http.put(url, json=data)
         put_response.raise_for_status()
-        return put_response.json()
+        result = put_response.json()
+        self._remember_blob(path, result["content"]["sha"], encoded)
+        return result
 
     def get_file(self, path):
+        content = self._get_local(path)
+        if content is not None:
+            return content
+
+        url = f"{self.base_url}/{path}"
+        headers = {"Accept": RAW_MEDIA_TYPE}
+        etag, etag_sha = self._etags.get(path, (None, None))
+        if etag and self.cache.contains(etag_sha):
+            headers["If-None-Match"] = etag
+
+        response = self.http.get(url, headers=headers, params={"ref": self.branch}, stream=True)
+        if response.status_code == 304:
+            # Non décompté du rate limit par GitHub
+            response.close()
+            cached = self.cache.get(etag_sha)
+            if cached is not None:
+                self._count("not_modified")
+                self._remember_blob(path, etag_sha)
+                return cached.decode("utf-8")
+            del headers["If-None-Match"]
+            response = self.http.get(url, headers=headers, params={"ref": self.branch}, stream=True)
+
+        # Contenu brut en flux vers le cache : ni base64, ni limite d'1 Mo de l'API contents
+        try:
+            response.raise_for_status()
+            sha = self._cache_stream(response.iter_content(DOWNLOAD_CHUNK_SIZE))
+        finally:
+            response.close()
+        self._count("downloads")
+        self._remember_blob(path, sha, etag=response.headers.get("ETag"))
+        if not self._bulk_reads:
+            self.flush_etags()
+        return self.cache.get(sha).decode("utf-8")
+
+    def stream_file(self, path, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        """Produit le contenu brut d'un fichier par blocs d'octets, sans passer par le JSON base64."""
         url = f"{self.base_url}/{path}"
-        response = requests.get(url, headers=self.headers, params={"ref": self.branch})
+        response = self.http.get(
+            url,
+            headers={"Accept": RAW_MEDIA_TYPE},
+            params={"ref": self.branch},
+            stream=True
+        )
+        try:
+            response.raise_for_status()
+            yield from response.iter_content(chunk_size)
+        finally:
+            response.close()
+
+    def download_file(self, path, destination: str) -> str:
+        """Télécharge un fichier (jusqu'à 100 Mo) directement sur disque, par blocs."""
+        with open(destination, "wb") as f:
+            for chunk in self.stream_file(path):
+                f.write(chunk)
+        return destination
+
+    def _cache_stream(self, chunks) -> str:
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache.directory, suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            # SHA git calculé en relisant le fichier : la taille doit précéder le contenu
+            digest = hashlib.sha1(f"blob {size}\0".encode("utf-8"))
+            with open(tmp_path, "rb") as f:
+                for block in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    digest.update(block)
+            sha = digest.hexdigest()
+            self.cache.put_file(sha, tmp_path)
+            return sha
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _get_local(self, path):
+        # Lecture de ses propres écritures pendant un lot non encore committé
+        if path in self._staging_area:
+            return self._staging_area[path]
+        if path in self._staged_deletions:
+            raise FileNotFoundError(f"404 Not Found : {path} (suppression en attente de commit)")
+
+        # SHA relevé à l'instant (listing, écriture) et blob en cache : aucun appel réseau.
+        # Sinon get_file revalide par une requête conditionnelle (ETag), gratuite si 304
+        sha = self._known_sha(path)
+        if sha:
+            cached = self.cache.get(sha)
+            if cached is not None:
+                self._count("cache_hits")
+                return cached.decode("utf-8")
+        return None
+
+    def get_files(self, paths, max_workers: int = 8, strategy: str = "auto"):
+        """Lectures concurrentes, produites dans l'ordre d'arrivée ; strategy : "rest", "graphql" ou "auto"."""
+        paths = list(paths)
+        if strategy == "graphql" or (strategy == "auto" and len(paths) >= self.graphql_threshold):
+            yield from self.get_files_graphql(paths)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            with self._bulk_read():
+                futures = {executor.submit(self.get_file, path): path for path in paths}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        yield path, future.result(), None
+                    except Exception as e:
+                        yield path, None, e
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_files_graphql(self, paths, batch_size: int = 100):
+        """Lit les blobs par lots de `batch_size` requêtes GraphQL ; binaires et tronqués relus en REST."""
+        with self._bulk_read():
+            yield from self._get_files_graphql(paths, batch_size)
+
+    def _get_files_graphql(self, paths, batch_size: int):
+        remaining = []
+        for path in paths:
+            try:
+                content = self._get_local(path)
+            except Exception as e:
+                yield path, None, e
+                continue
+            if content is None:
+                remaining.append(path)
+            else:
+                yield path, content, None
+
+        for start in range(0, len(remaining), batch_size):
+            chunk = remaining[start:start + batch_size]
+            try:
+                blobs = self._query_blobs(chunk)
+            except Exception as e:
+                for path in chunk:
+                    yield path, None, e
+                continue
+
+            for path, blob in zip(chunk, blobs):
+                if blob is None:
+                    yield path, None, FileNotFoundError(f"404 Not Found : {path}")
+                elif blob["isBinary"] or blob["isTruncated"] or blob["text"] is None:
+                    try:
+                        yield path, self.get_file(path), None
+                    except Exception as e:
+                        yield path, None, e
+                else:
+                    self._count("downloads")
+                    self._remember_blob(path, blob["oid"], blob["text"].encode("utf-8"))
+                    yield path, blob["text"], None
+
+    def read_prefixes(self, prefixes: list[str], suffix: str = ""):
+        """Lit des dossiers entiers : cache et lectures unitaires, ou archive du dépôt à froid."""
+        tree = {}
+        for prefix in prefixes:
+            tree.update(self.list_tree(prefix))
+        paths = [path for path in tree if path.endswith(suffix)]
+        missing = {path for path in paths if not self.cache.contains(tree[path]["sha"])}
+
+        done = set()
+        if len(missing) >= self.snapshot_threshold:
+            for path, content, error in self.iter_snapshot(prefixes, paths=missing):
+                missing.discard(path)
+                done.add(path)
+                yield path, content, error
+
+        # Blobs en cache sous le SHA du listing qui vient d'être fait : aucune requête
+        for path in paths:
+            if path in missing or path in done:
+                continue
+            cached = self.cache.get(tree[path]["sha"])
+            if cached is None:
+                missing.add(path)
+                continue
+            self._count("cache_hits")
+            try:
+                yield path, cached.decode("utf-8"), None
+            except UnicodeDecodeError as e:
+                yield path, None, e
+        # Blobs absents du cache, ou de l'archive (ajoutés entre-temps)
+        yield from self.get_files(sorted(missing))
+
+    def iter_snapshot(self, prefixes: list[str], paths=None, suffix: str = ""):
+        """Produit (chemin, contenu, erreur) depuis l'archive tar.gz de la branche, lue en flux."""
+        prefixes = [prefix.strip("/") + "/" for prefix in prefixes]
+        wanted = set(paths) if paths is not None else None
+        response = self.http.get(f"{self.repo_url}/tarball/{self.branch}", stream=True)
         response.raise_for_status()
-        content_encoded = response.json()["content"]
-        return base64.b64decode(content_encoded).decode("utf-8")
+        response.raw.decode_content = True
+        try:
+            with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    # Le premier segment est le dossier racine "owner-repo-sha"
+                    path = member.name.split("/", 1)[-1]
+                    if not path.endswith(suffix) or not any(path.startswith(prefix) for prefix in prefixes):
+                        continue
+                    if wanted is not None and path not in wanted:
+                        continue
+                    content = archive.extractfile(member).read()
+                    self._count("downloads")
+                    self._remember_blob(path, git_blob_sha(content), content)
+                    try:
+                        yield path, content.decode("utf-8"), None
+                    except UnicodeDecodeError as e:
+                        yield path, None, e
+        finally:
+            response.close()
+
+    def _query_blobs(self, paths: list[str]) -> list:
+        variables = {"owner": self.owner, "name": self.repo}
+        declarations = ["$owner: String!", "$name: String!"]
+        fields = []
+        for i, path in enumerate(paths):
+            variables[f"e{i}"] = f"{self.branch}:{path}"
+            declarations.append(f"$e{i}: String!")
+            fields.append(f"f{i}: object(expression: $e{i}) {{ ... on Blob {{ oid text isBinary isTruncated }} }}")
+        query = (
+            f"query({', '.join(declarations)}) {{ repository(owner: $owner, name: $name) {{ "
+            + " ".join(fields)
+            + " } }"
+        )
+
+        response = self.http.post(f"{self.api_base}/graphql", json={"query": query, "variables": variables})
+        response.raise_for_status()
+        data = response.json()
+        repository = (data.get("data") or {}).get("repository")
+        if repository is None:
+            raise RuntimeError(f"Erreur GraphQL : {data.get('errors')}")
+        return [repository.get(f"f{i}") for i in range(len(paths))]
 
     def delete_file(self, path, commit_message):
+        if self._batch_depth:
+            self.stage_deletion(path)
+            return {"path": path, "staged": True}
+
         url = f"{self.base_url}/{path}"
-        response = requests.get(url, headers=self.headers, params={"ref": self.branch})
+        response = self.http.get(url, params={"ref": self.branch})
         response.raise_for_status()
         sha = response.json()["sha"]
 
@@ -55,37 +354,273 @@ class GitHubClient:
             "branch": self.branch,
             "sha": sha
         }
-        del_response = requests.delete(url, headers=self.headers, json=data)
+        del_response = self.http.delete(url, json=data)
         del_response.raise_for_status()
+        self._forget_blob(path)
         return del_response.json()
 
     def list_files(self, path: str) -> list[str]:
-        url = f"{self.api_base}/repos/{self.owner}/{self.repo}/contents/{path}"
-        files = []
+        files = [f for f in self.list_tree(path) if f not in self._staged_deletions]
+        prefix = path.rstrip("/") + "/"
+        files.extend(p for p in self._staging_area if p.startswith(prefix) and p not in files)
+        return files
+
+    def list_tree(self, prefix: str = "") -> dict:
+        """Liste récursive sous `prefix` via git/trees : {chemin: {"sha", "size"}}."""
+        prefix = prefix.strip("/")
+        tree_ish = f"{self.branch}:{prefix}" if prefix else self.branch
+        entries = {}
+        self._walk_tree(tree_ish, prefix, entries)
+        now = time.monotonic()
+        with self._lock:
+            self._known_shas.update({path: entry["sha"] for path, entry in entries.items()})
+            self._known_at.update({path: now for path in entries})
+        return dict(sorted(entries.items()))
 
-        response = requests.get(url, headers=self.headers, params={"ref": self.branch})
+    def _walk_tree(self, tree_ish: str, prefix: str, entries: dict):
+        url = f"{self.repo_url}/git/trees/{quote(tree_ish, safe=':/')}"
+        response = self.http.get(url, params={"recursive": 1})
+        if response.status_code == 404:
+            raise FileNotFoundError(f"404 Not Found : {prefix or '/'}")
         if response.status_code != 200:
-            raise RuntimeError(f"Erreur lors de la récupération du dossier {path} : {response.text}")
+            raise RuntimeError(f"Erreur lors de la récupération du dossier {prefix or '/'} : {response.text}")
+        data = response.json()
 
-        for item in response.json():
-            if item["type"] == "file":
-                files.append(item["path"])
-            elif item["type"] == "dir":
-                files.extend(self.list_files(item["path"]))
+        if not data.get("truncated"):
+            self._add_tree_items(data["tree"], prefix, entries)
+            return
 
-        return files
+        # Arbre tronqué : on liste ce niveau sans récursion puis on traite chaque sous-arbre
+        response = self.http.get(f"{self.repo_url}/git/trees/{data['sha']}")
+        response.raise_for_status()
+        for item in response.json()["tree"]:
+            path = f"{prefix}/{item['path']}" if prefix else item["path"]
+            if item["type"] == "tree":
+                self._walk_tree(item["sha"], path, entries)
+            else:
+                self._add_tree_items([item], prefix, entries)
+
+    @staticmethod
+    def _add_tree_items(items: list, prefix: str, entries: dict):
+        for item in items:
+            if item["type"] != "blob":
+                continue
+            path = f"{prefix}/{item['path']}" if prefix else item["path"]
+            entries[path] = {"sha": item["sha"], "size": item.get("size")}
+
+    def commit_files(self, files: dict, commit_message: str, deletions=None, expected_shas: dict = None):
+        """Commit unique via la Git Data API ; avec expected_shas, ConflictError sur écriture concurrente."""
+        deletions = set(deletions or ()) - set(files)
+        if not files and not deletions:
+            raise ValueError("Aucun fichier à committer")
+
+        # Écritures idempotentes : on écarte les fichiers dont le SHA distant connu est identique
+        blobs = {path: content.encode("utf-8") for path, content in files.items()}
+        shas = {path: git_blob_sha(data) for path, data in blobs.items()}
+        unchanged = [path for path in files if self._known_sha(path) == shas[path]]
+        if unchanged:
+            self._count("skipped_writes", len(unchanged))
+            files = {path: content for path, content in files.items() if path not in unchanged}
+        if not files and not deletions:
+            return None
+
+        ref_url = f"{self.repo_url}/git/refs/heads/{self.branch}"
+        ref_response = self.http.get(ref_url)
+        ref_response.raise_for_status()
+        head_sha = ref_response.json()["object"]["sha"]
+
+        if expected_shas:
+            self._check_expected_shas(head_sha, expected_shas)
+
+        commit_response = self.http.get(f"{self.repo_url}/git/commits/{head_sha}")
+        commit_response.raise_for_status()
+        base_tree = commit_response.json()["tree"]["sha"]
+
+        tree = [
+            {"path": path, "mode": "100644", "type": "blob", "content": content}
+            for path, content in files.items()
+        ]
+        tree.extend(
+            {"path": path, "mode": "100644", "type": "blob", "sha": None}
+            for path in sorted(deletions)
+        )
+        tree_response = self.http.post(
+            f"{self.repo_url}/git/trees",
+            json={"base_tree": base_tree, "tree": tree}
+        )
+        tree_response.raise_for_status()
+        if tree_response.json()["sha"] == base_tree:
+            # Arbre identique au commit parent : rien n'a changé, pas de commit vide
+            self._count("skipped_writes", len(files))
+            for path in files:
+                self._remember_blob(path, shas[path], blobs[path])
+            return None
+
+        new_commit = self.http.post(
+            f"{self.repo_url}/git/commits",
+            json={
+                "message": commit_message,
+                "tree": tree_response.json()["sha"],
+                "parents": [head_sha]
+            }
+        )
+        new_commit.raise_for_status()
+        commit = new_commit.json()
+
+        update_response = self.http.patch(ref_url, json={"sha": commit["sha"]})
+        if update_response.status_code == 422:
+            # La branche a avancé depuis la lecture de la ref : pas de fast-forward possible
+            raise ConflictError(f"409 Conflit : {self.branch} a été modifiée pendant l'écriture")
+        update_response.raise_for_status()
+        for path in files:
+            self._remember_blob(path, shas[path], blobs[path])
+        for path in deletions:
+            self._forget_blob(path)
+        return commit
+
+    def _check_expected_shas(self, head_sha: str, expected_shas: dict):
+        current = {}
+        for directory in sorted({path.rpartition("/")[0] for path in expected_shas}):
+            tree_ish = f"{head_sha}:{directory}" if directory else head_sha
+            response = self.http.get(f"{self.repo_url}/git/trees/{quote(tree_ish, safe=':/')}")
+            if response.status_code == 404:
+                continue
+            response.raise_for_status()
+            self._add_tree_items(response.json()["tree"], directory, current)
+        stale = sorted(path for path, sha in expected_shas.items() if current.get(path, {}).get("sha") != sha)
+        if stale:
+            raise ConflictError(f"409 Conflit : {', '.join(stale)} modifié(s) depuis la lecture")
+
+    def _known_sha(self, path: str):
+        """SHA distant du fichier s'il a été relevé il y a moins de known_sha_ttl secondes, sinon None."""
+        with self._lock:
+            sha = self._known_shas.get(path)
+            if sha and time.monotonic() - self._known_at.get(path, float("-inf")) <= self.known_sha_ttl:
+                return sha
+        return None
+
+    def _remember_blob(self, path: str, sha: str, content: bytes = None, etag: str = None):
+        if content is not None:
+            self.cache.set(sha, content)
+        with self._lock:
+            self._known_shas[path] = sha
+            self._known_at[path] = time.monotonic()
+            if etag:
+                self._etags[path] = (etag, sha)
+                self._etags_dirty = True
+
+    def _forget_blob(self, path: str):
+        with self._lock:
+            self._known_shas.pop(path, None)
+            self._known_at.pop(path, None)
+            if self._etags.pop(path, None):
+                self._etags_dirty = True
+
+    @contextmanager
+    def _bulk_read(self):
+        """Lectures groupées : les ETags sont enregistrés une seule fois, à la fin du lot."""
+        with self._lock:
+            self._bulk_reads += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._bulk_reads -= 1
+            if not self._bulk_reads:
+                self.flush_etags()
+
+    def flush_etags(self):
+        """Enregistre les ETags sur disque s'ils ont changé."""
+        with self._lock:
+            if not self._etags_dirty:
+                return
+            self._save_etags()
+            self._etags_dirty = False
+
+    def close(self):
+        self.flush_etags()
+        self.http.close()
+
+    def _load_etags(self) -> dict:
+        try:
+            with open(self._etags_path, "r", encoding="utf-8") as f:
+                return {path: tuple(value) for path, value in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_etags(self):
+        # Fichier temporaire unique : l'application et la synchronisation partagent le cache
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self._etags_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._etags, f)
+            os.replace(tmp_path, self._etags_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.metrics[name] = self.metrics.get(name, 0) + value
 
     def stage_file(self, path, content):
+        untouched = path not in self._staging_area and path not in self._staged_deletions
+        if untouched and self._known_sha(path) == git_blob_sha(content.encode("utf-8")):
+            self._count("skipped_writes")
+            return
+        self._staged_deletions.discard(path)
+        previous = self._staging_area.get(path)
+        if previous is not None:
+            self._staged_bytes -= len(previous.encode("utf-8"))
         self._staging_area[path] = content
+        self._staged_bytes += len(content.encode("utf-8"))
+        self._mark_staged()
+
+    def stage_deletion(self, path):
+        previous = self._staging_area.pop(path, None)
+        if previous is not None:
+            self._staged_bytes -= len(previous.encode("utf-8"))
+        self._staged_deletions.add(path)
+        self._mark_staged()
+
+    def _mark_staged(self):
+        if self._staged_since is None:
+            self._staged_since = time.monotonic()
+        if not self._batch_depth:
+            return
+        too_big = self._staged_bytes >= self.max_staged_bytes
+        too_old = time.monotonic() - self._staged_since >= self.flush_interval
+        if too_big or too_old:
+            self.commit_staged_files(self._batch_message)
 
     def commit_staged_files(self, commit_message="Commit multiple files"):
-        if not self._staging_area:
+        if not self._staging_area and not self._staged_deletions:
             raise ValueError("Aucun fichier à committer")
-        for path, content in self._staging_area.items():
-            self.upload_file(path, content, commit_message)
+        commit = self.commit_files(self._staging_area, commit_message, deletions=self._staged_deletions)
         self._staging_area = {}
+        self._staged_deletions = set()
+        self._staged_bytes = 0
+        self._staged_since = None
+        return commit
 
     def upload_files(self, files: dict, commit_message="Commit multiple files"):
         for path, content in files.items():
             self.stage_file(path, content)
-        self.commit_staged_files(commit_message)
+        if not self._batch_depth and (self._staging_area or self._staged_deletions):
+            return self.commit_staged_files(commit_message)
+
+    @contextmanager
+    def batch(self, commit_message="Commit multiple files"):
+        """Regroupe les écritures du bloc en un seul commit à la sortie."""
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self._batch_message = commit_message
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            raise
+        else:
+            self._batch_depth -= 1
+            if not self._batch_depth and (self._staging_area or self._staged_deletions):
+                self.commit_staged_files(self._batch_message)
@@ -0,0 +1,96 @@
+import time
+import requests
+from urllib.parse import urlparse
+from utils.http_session import ResilientSession
+
+WRITE_METHODS = {"POST", "PATCH", "PUT", "DELETE"}
+
+
+class GitHubSession(ResilientSession):
+    """
+    Transport HTTP de GitHubClient. En plus des retries, il lit X-RateLimit-Remaining /
+    X-RateLimit-Reset et ralentit progressivement les requêtes quand le quota restant baisse,
+    espace les requêtes d'écriture (limite secondaire de création de contenu) et attend la
+    fin de la fenêtre sur un 403/429 de limitation. Les quotas sont suivis par ressource
+    (X-RateLimit-Resource : "core" pour REST, "graphql"), et les lectures GraphQL, bien qu'en
+    POST, ne sont pas espacées comme des écritures.
+    """
+
+    def __init__(
+        self,
+        headers: dict = None,
+        slowdown_threshold: float = 0.2,
+        min_write_interval: float = 1.0,
+        secondary_backoff: float = 60.0,
+        **kwargs
+    ):
+        super().__init__(headers=headers, **kwargs)
+        self.slowdown_threshold = slowdown_threshold
+        self.min_write_interval = min_write_interval
+        self.secondary_backoff = secondary_backoff
+        self.rate_limits = {}
+        self._last_write = None
+
+    @property
+    def rate_limit(self) -> dict:
+        """Quota REST ("core")."""
+        return self.rate_limits.get("core", {"limit": None, "remaining": None, "reset": None})
+
+    @staticmethod
+    def _resource(url: str) -> str:
+        return "graphql" if urlparse(url).path.rstrip("/").endswith("/graphql") else "core"
+
+    def _delay_before_request(self, method: str, url: str) -> float:
+        now = time.time()
+        delay = 0.0
+        resource = self._resource(url)
+        with self._lock:
+            rate_limit = self.rate_limits.get(resource, {})
+            limit = rate_limit.get("limit")
+            remaining = rate_limit.get("remaining")
+            reset = rate_limit.get("reset")
+            if remaining is not None and reset is not None and reset > now:
+                if remaining <= 0:
+                    delay = reset - now
+                elif limit and remaining < limit * self.slowdown_threshold:
+                    # Répartit le quota restant uniformément jusqu'à la réinitialisation
+                    delay = (reset - now) / remaining
+
+            if method.upper() in WRITE_METHODS and resource != "graphql":
+                monotonic = time.monotonic()
+                if self._last_write is not None:
+                    delay = max(delay, self._last_write + self.min_write_interval - monotonic)
+                self._last_write = monotonic + max(delay, 0.0)
+        return delay
+
+    def _after_response(self, method: str, url: str, response: requests.Response):
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        resource = headers.get("X-RateLimit-Resource") or self._resource(url)
+        try:
+            rate_limit = {
+                "remaining": int(headers["X-RateLimit-Remaining"]),
+                "limit": int(headers.get("X-RateLimit-Limit", 0)) or None,
+                "reset": float(headers.get("X-RateLimit-Reset", 0)) or None,
+            }
+        except ValueError:
+            return
+        with self._lock:
+            self.rate_limits[resource] = rate_limit
+
+    def _retry_delay(self, response: requests.Response, attempt: int):
+        if response.status_code not in (403, 429):
+            return super()._retry_delay(response, attempt)
+
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            return retry_after
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = float(response.headers.get("X-RateLimit-Reset", 0))
+            return max(reset - time.time(), 1.0)
+        if response.status_code == 429 or "rate limit" in response.text.lower():
+            # Limite secondaire sans indication : au moins une minute, puis exponentiel
+            return self.secondary_backoff * (2 ** attempt)
+        # 403 ordinaire (droits insuffisants) : pas de retry
+        return None
@@ -1,17 +1,108 @@
 import os
+import json
+import time
+import hashlib
+import threading
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import urllib3
 import streamlit as st
 from dotenv import load_dotenv
+from utils.http_session import ResilientSession
+from utils.disk_cache import DiskCache
+from utils.rate_limiter import RateLimiter
+from utils.text_chunker import estimate_tokens, group_by_tokens, split_text
+
+# Version des prompts intégrés (résumés…) : à incrémenter quand l'un d'eux change, pour que
+# le cache de réponses ne resserve pas des réponses produites par l'ancienne formulation
+PROMPT_VERSION = "1"
+
+
+class GPTSession(ResilientSession):
+    """
+    Session HTTP pour l'API OpenAI : mêmes retries que ResilientSession (429, 5xx, timeouts,
+    connexions coupées, avec Retry-After), sauf quota épuisé, qui ne se résorbe pas en attendant.
+    """
+
+    def _retry_delay(self, response: requests.Response, attempt: int):
+        if response.status_code == 429 and "insufficient_quota" in response.text:
+            return None
+        return super()._retry_delay(response, attempt)
+
+
+# Session partagée par tous les GPTClient du processus : connexions keep-alive réutilisées
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def shared_session() -> GPTSession:
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = GPTSession(
+                max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "4")),
+                pool_size=int(os.getenv("OPENAI_POOL_SIZE", "10")),
+                timeout=None
+            )
+        return _shared_session
+
+
+_shared_cache = None
+_shared_limiter = None
+
+
+def shared_limiter() -> RateLimiter:
+    """Limites RPM / TPM du compte, communes à tous les appels du processus."""
+    global _shared_limiter
+    with _shared_session_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(
+                rpm=float(os.getenv("OPENAI_RPM", "500")),
+                tpm=float(os.getenv("OPENAI_TPM", "30000"))
+            )
+        return _shared_limiter
+
+
+def shared_cache():
+    """Cache disque des réponses, partagé par le processus ; None si OPENAI_CACHE=0."""
+    global _shared_cache
+    if os.getenv("OPENAI_CACHE", "1") == "0":
+        return None
+    with _shared_session_lock:
+        if _shared_cache is None:
+            _shared_cache = DiskCache(
+                os.getenv("OPENAI_CACHE_DIR", os.path.join(".cache", "gpt")),
+                max_bytes=int(os.getenv("OPENAI_CACHE_MAX_MB", "100")) * 1024 * 1024,
+                ttl=float(os.getenv("OPENAI_CACHE_TTL_DAYS", "30")) * 86400
+            )
+        return _shared_cache
+
 
 class GPTClient:
-    def __init__(self, api_key: str = None, model: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = None,
+        session: GPTSession = None,
+        cache: DiskCache = None,
+        limiter: RateLimiter = None
+    ):
         load_dotenv()
         self.api_key = api_key or os.getenv("OPENAI_API_KEY") or st.secrets["OPENAI_API_KEY"]
         if not self.api_key:
             raise ValueError("Veuillez définir OPENAI_API_KEY dans le fichier .env")
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o")
         self.url = "https://api.openai.com/v1/chat/completions"
+        self.http = session or shared_session()
+        # Délai total par défaut d'un appel, tentatives et attentes comprises
+        self.deadline = float(os.getenv("OPENAI_DEADLINE", "60"))
+        self.cache = cache if cache is not None else shared_cache()
+        self.limiter = limiter or shared_limiter()
+        # Taille maximale (tokens estimés) d'un texte envoyé en un seul appel par map_reduce()
+        self.chunk_tokens = int(os.getenv("OPENAI_CHUNK_TOKENS", "6000"))
+        self.metrics = {"cache_hits": 0, "cache_misses": 0}
+        self._lock = threading.Lock()
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
     def complete(
@@ -20,14 +111,211 @@ class GPTClient:
         system_prompt: str = "Tu es un assistant professionnel.",
         temperature: float = 0.3,
         max_tokens: int = 512,
-        timeout: float = 15.0  # Ajout d’un timeout explicite
+        timeout: float = None,
+        use_cache: bool = True,
+        prompt_version: str = PROMPT_VERSION
     ) -> str:
-        headers = {
+        """
+        timeout : échéance de l'appel en secondes (OPENAI_DEADLINE par défaut), comptée après
+        l'attente éventuelle dans le limiteur RPM / TPM local. Les erreurs
+        transitoires (429, 5xx, timeouts) sont réessayées avec backoff tant qu'elle n'est pas atteinte.
+        Une requête identique (modèle, prompts, paramètres, version des prompts) déjà traitée est
+        servie par le cache disque, sans appel à l'API.
+        """
+        key = self._cache_key(prompt, system_prompt, temperature, max_tokens, prompt_version)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            self._count("cache_hits" if cached is not None else "cache_misses")
+            if cached is not None:
+                return cached.decode("utf-8")
+
+        # Budget RPM / TPM : tokens estimés du prompt + plafond de la réponse. L'attente locale
+        # ne compte pas dans l'échéance de l'appel, qui part de l'envoi de la requête
+        self.limiter.acquire(estimate_tokens(system_prompt) + estimate_tokens(prompt) + max_tokens)
+        deadline = time.monotonic() + (timeout or self.deadline)
+        try:
+            response = self.http.post(
+                self.url,
+                headers=self._headers(),
+                json=self._payload(prompt, system_prompt, temperature, max_tokens),
+                deadline=deadline,
+                verify=False
+            )
+            response.raise_for_status()
+            content = response.json()['choices'][0]['message']['content'].strip()
+        except requests.exceptions.Timeout:
+            raise RuntimeError("La requête GPT a expiré.")
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"Erreur HTTP GPT : {e}")
+
+        if use_cache and self.cache is not None:
+            self.cache.set(key, content.encode("utf-8"))
+        return content
+
+    def stream(
+        self,
+        prompt: str,
+        system_prompt: str = "Tu es un assistant professionnel.",
+        temperature: float = 0.3,
+        max_tokens: int = 512,
+        timeout: float = None,
+        use_cache: bool = True,
+        prompt_version: str = PROMPT_VERSION
+    ):
+        """
+        Comme complete(), mais produit la réponse au fil de l'eau (server-sent events) : chaque
+        fragment de texte est cédé dès sa réception. Une réponse en cache est cédée d'un bloc ;
+        une réponse reçue en entier est mise en cache.
+        """
+        key = self._cache_key(prompt, system_prompt, temperature, max_tokens, prompt_version)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            self._count("cache_hits" if cached is not None else "cache_misses")
+            if cached is not None:
+                yield cached.decode("utf-8")
+                return
+
+        self.limiter.acquire(estimate_tokens(system_prompt) + estimate_tokens(prompt) + max_tokens)
+        deadline = time.monotonic() + (timeout or self.deadline)
+        parts = []
+        try:
+            response = self.http.post(
+                self.url,
+                headers=self._headers(),
+                json={**self._payload(prompt, system_prompt, temperature, max_tokens), "stream": True},
+                deadline=deadline,
+                stream=True,
+                verify=False
+            )
+            with response:
+                response.raise_for_status()
+                for delta in self._deltas(response):
+                    if time.monotonic() > deadline:
+                        raise requests.exceptions.Timeout()
+                    parts.append(delta)
+                    yield delta
+        except requests.exceptions.Timeout:
+            raise RuntimeError("La requête GPT a expiré.")
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"Erreur HTTP GPT : {e}")
+
+        if use_cache and self.cache is not None:
+            self.cache.set(key, "".join(parts).strip().encode("utf-8"))
+
+    @staticmethod
+    def _deltas(response: requests.Response):
+        """Fragments de texte d'une réponse en streaming (lignes « data: {...} », fin sur [DONE])."""
+        for line in response.iter_lines():
+            # Décodage par ligne : le flux est en UTF-8 quel que soit l'encodage annoncé
+            line = line.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            choices = json.loads(data).get("choices") or [{}]
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                yield content
+
+    def complete_many(self, items: list, max_workers: int = 4, ordered: bool = True):
+        """
+        Exécute plusieurs complétions en parallèle (au plus `max_workers` à la fois, dans les
+        limites RPM / TPM partagées). Chaque requête est un prompt (str), un dict d'arguments
+        de complete(), un appelable sans argument qui retourne la réponse (traitement en
+        plusieurs appels, comme map_reduce()), ou None (pas d'appel, réponse vide).
+        Produit des tuples (position, réponse, erreur) comme ContentStorage.get_files :
+        l'erreur est None en cas de succès. ordered=True : dans l'ordre des requêtes, avec au
+        plus 2 × max_workers réponses en attente ; sinon au fil de l'eau.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            if not ordered:
+                futures = {pool.submit(self._complete_one, request): i for i, request in enumerate(items)}
+                for future in as_completed(futures):
+                    yield (futures[future], *future.result())
+                return
+
+            pending = deque()
+            for i, request in enumerate(items):
+                pending.append((i, pool.submit(self._complete_one, request)))
+                if len(pending) >= 2 * max_workers:
+                    position, future = pending.popleft()
+                    yield (position, *future.result())
+            while pending:
+                position, future = pending.popleft()
+                yield (position, *future.result())
+
+    def _complete_one(self, request) -> tuple:
+        if request is None:
+            return "", None
+        try:
+            if callable(request):
+                return request(), None
+            return self.complete(**self._arguments(request)), None
+        except Exception as e:
+            return None, e
+
+    def map_reduce(
+        self,
+        text: str,
+        map_request,
+        reduce_request,
+        chunk_tokens: int = None,
+        max_workers: int = 4,
+        stream: bool = False
+    ):
+        """
+        Traite un texte trop long pour un seul appel : découpé en blocs (paragraphes, tours de
+        parole) d'au plus `chunk_tokens` tokens, chaque bloc est traité en parallèle par
+        map_request(bloc), puis les résultats partiels sont fusionnés par reduce_request(partiels),
+        par groupes successifs tant qu'ils ne tiennent pas ensemble dans un bloc.
+        Les requêtes sont un prompt (str) ou un dict d'arguments de complete(). Un texte qui tient
+        dans un bloc est traité par un seul appel map_request(texte).
+        stream=True : la dernière étape est produite au fil de l'eau, comme stream().
+        """
+        chunk_tokens = chunk_tokens or self.chunk_tokens
+        chunks = split_text(text, chunk_tokens)
+        if len(chunks) <= 1:
+            final = map_request(text)
+        else:
+            partials = self._complete_all([map_request(chunk) for chunk in chunks], max_workers)
+            groups = group_by_tokens(partials, chunk_tokens)
+            while len(groups) > 1:
+                if len(groups) == len(partials):
+                    # Partiels trop longs pour être regroupés : fusion deux à deux
+                    groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+                partials = self._complete_all([reduce_request(group) for group in groups], max_workers)
+                groups = group_by_tokens(partials, chunk_tokens)
+            final = reduce_request(partials)
+
+        if stream:
+            return self.stream(**self._arguments(final))
+        return self.complete(**self._arguments(final))
+
+    def _complete_all(self, items: list, max_workers: int) -> list[str]:
+        """Réponses de toutes les requêtes, dans l'ordre ; la première erreur est relevée."""
+        if max_workers <= 1:
+            # Séquentiel, sans pool : appelé depuis un worker de complete_many (summary_task)
+            return [self.complete(**self._arguments(request)) for request in items]
+        responses = []
+        for _, content, error in self.complete_many(items, max_workers=max_workers):
+            if error:
+                raise error
+            responses.append(content)
+        return responses
+
+    @staticmethod
+    def _arguments(request) -> dict:
+        return {"prompt": request} if isinstance(request, str) else request
+
+    def _headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-        data = {
+    def _payload(self, prompt, system_prompt, temperature, max_tokens) -> dict:
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
@@ -37,43 +325,73 @@ class GPTClient:
             "max_tokens": max_tokens
         }
 
-        try:
-            with requests.Session() as session:
-                response = session.post(
-                    self.url,
-                    headers=headers,
-                    json=data,
-                    timeout=timeout,
-                    verify=False
-                )
-                response.raise_for_status()
-                return response.json()['choices'][0]['message']['content'].strip()
+    def _cache_key(self, prompt, system_prompt, temperature, max_tokens, prompt_version) -> str:
+        payload = json.dumps(
+            [self.model, system_prompt, prompt, temperature, max_tokens, prompt_version],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-        except requests.exceptions.Timeout:
-            raise RuntimeError("La requête GPT a expiré.")
-        except requests.exceptions.RequestException as e:
-            raise RuntimeError(f"Erreur HTTP GPT : {e}")
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.metrics[name] += value
 
     def summarize_email(self, body: str) -> str:
         """
         Utilise GPT pour générer un résumé concis et professionnel du corps de l'email.
         """
-        if not body.strip():
+        task = self.summary_task(body)
+        if task is None:
             return ""
 
+        try:
+            return task() if callable(task) else self.complete(**task)
+        except Exception as e:
+            print(f"[GPT] Échec du résumé : {e}")
+            return ""
+
+    def summary_task(self, body: str):
+        """
+        Requête de résumé pour complete_many() : les arguments de complete() si le corps tient
+        en un appel, sinon un appelable qui le résume par map_reduce() (None si le corps est vide).
+        Les parties d'un long corps sont résumées l'une après l'autre dans le worker appelant.
+        """
+        request = self.summary_request(body)
+        if request is None or estimate_tokens(body) <= self.chunk_tokens:
+            return request
+        return lambda: self.map_reduce(body, self.summary_request, self.summaries_merge_request, max_workers=1)
+
+    @staticmethod
+    def summary_request(body: str):
+        """Arguments de complete() pour résumer un email (None si le corps est vide)."""
+        if not body.strip():
+            return None
+
         prompt = (
             "Voici le corps d’un email professionnel. Résume-le en une ou deux phrases claires et précises, "
             "en conservant les informations clés. Ignore les formules de politesse ou les signatures :\n\n"
             f"{body.strip()}"
         )
+        return {
+            "prompt": prompt,
+            "system_prompt": "Tu es un assistant qui génère des résumés d’emails professionnels en français.",
+            "temperature": 0.4,
+            "max_tokens": 200
+        }
 
-        try:
-            return self.complete(
-                prompt=prompt,
-                system_prompt="Tu es un assistant qui génère des résumés d’emails professionnels en français.",
-                temperature=0.4,
-                max_tokens=200
-            )
-        except Exception as e:
-            print(f"[GPT] Échec du résumé : {e}")
-            return ""
+    @staticmethod
+    def summaries_merge_request(summaries: list[str]) -> dict:
+        """Arguments de complete() pour fusionner les résumés des parties successives d'un long email."""
+        parts = "\n\n".join(f"Partie {i} : {summary.strip()}" for i, summary in enumerate(summaries, 1))
+        prompt = (
+            "Voici, dans l’ordre, les résumés des parties successives d’un long email professionnel. "
+            "Fusionne-les en un résumé unique d’une ou deux phrases claires et précises, "
+            "en conservant les informations clés :\n\n"
+            f"{parts}"
+        )
+        return {
+            "prompt": prompt,
+            "system_prompt": "Tu es un assistant qui génère des résumés d’emails professionnels en français.",
+            "temperature": 0.4,
+            "max_tokens": 200
+        }
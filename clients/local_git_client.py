@@ -0,0 +1,208 @@
+import os
+import time
+import subprocess
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from clients.content_storage import ConflictError, ContentStorage
+
+
+# Verrou posé dans .git pendant les écritures conditionnelles ; au-delà de ce délai, il est
+# considéré comme abandonné par un processus interrompu
+WRITE_LOCK_TIMEOUT = 60.0
+
+
+class LocalGitClient(ContentStorage):
+    """
+    Stockage sur une copie de travail git locale : lectures directes sur le disque,
+    un `git commit` par écriture (ou par lot), et `sync()` pour pull --rebase + push.
+    """
+
+    def __init__(self, repo_path: str = None, remote: str = None, branch: str = None):
+        load_dotenv()
+        self.root = os.path.abspath(repo_path or os.getenv("CONTENT_REPO_PATH", "content"))
+        self.remote = remote or os.getenv("CONTENT_REMOTE", "origin")
+        self.branch = branch or os.getenv("GITHUB_BRANCH", "main")
+        self.owner = os.getenv("GITHUB_OWNER")
+        self.repo = os.getenv("GITHUB_REPO")
+        if not os.path.isdir(os.path.join(self.root, ".git")):
+            raise ValueError(f"{self.root} n'est pas une copie de travail git (CONTENT_REPO_PATH)")
+        self._batch_depth = 0
+        self._batch_message = None
+        self.metrics = {"skipped_writes": 0}
+
+    def get_file(self, path):
+        try:
+            with open(self._abspath(path), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"404 Not Found : {path}")
+
+    def upload_file(self, path, content, commit_message):
+        full_path = self._abspath(path)
+        if os.path.exists(full_path):
+            with open(full_path, "r", encoding="utf-8", newline="") as f:
+                if f.read() == content:
+                    self.metrics["skipped_writes"] += 1
+                    return {"path": path, "skipped": True}
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        self._git("add", "--", path)
+        self._commit_if_needed(commit_message)
+        return {"path": path}
+
+    def delete_file(self, path, commit_message):
+        if not os.path.exists(self._abspath(path)):
+            raise FileNotFoundError(f"404 Not Found : {path}")
+        self._git("rm", "-q", "--", path)
+        self._commit_if_needed(commit_message)
+        return {"path": path}
+
+    def list_files(self, path: str) -> list[str]:
+        if not os.path.isdir(self._abspath(path)):
+            raise RuntimeError(f"Erreur lors de la récupération du dossier {path} : dossier introuvable")
+        return list(self.list_tree(path))
+
+    def list_tree(self, prefix: str = "") -> dict:
+        prefix = prefix.strip("/")
+        args = ["ls-files", "-s", "-z"]
+        if prefix:
+            args += ["--", prefix]
+        entries = {}
+        for line in self._git(*args).split("\0"):
+            if not line:
+                continue
+            info, path = line.split("\t", 1)
+            sha = info.split()[1]
+            if prefix and not (path == prefix or path.startswith(prefix + "/")):
+                continue
+            full_path = self._abspath(path)
+            if os.path.exists(full_path):
+                entries[path] = {"sha": sha, "size": os.path.getsize(full_path)}
+        return dict(sorted(entries.items()))
+
+    def upload_files(self, files: dict, commit_message="Commit multiple files"):
+        with self.batch(commit_message):
+            for path, content in files.items():
+                self.upload_file(path, content, commit_message)
+
+    def commit_files(self, files: dict, commit_message: str, deletions=None, expected_shas: dict = None):
+        deletions = set(deletions or ()) - set(files)
+        with self._write_lock():
+            if expected_shas:
+                current = self._index_shas(list(expected_shas))
+                stale = sorted(path for path, sha in expected_shas.items() if current.get(path) != sha)
+                if stale:
+                    raise ConflictError(f"409 Conflit : {', '.join(stale)} modifié(s) depuis la lecture")
+
+            paths = []
+            for path, content in files.items():
+                full_path = self._abspath(path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, "w", encoding="utf-8", newline="") as f:
+                    f.write(content)
+                paths.append(path)
+            if paths:
+                self._git("add", "--", *paths)
+            for path in sorted(deletions):
+                if os.path.exists(self._abspath(path)):
+                    self._git("rm", "-q", "--", path)
+                    paths.append(path)
+
+            changed = subprocess.run(
+                ["git", "-C", self.root, "diff", "--cached", "--quiet", "--", *paths],
+                capture_output=True
+            )
+            if not paths or changed.returncode == 0:
+                self.metrics["skipped_writes"] += len(files)
+                return None
+            # Seuls ces chemins entrent dans le commit, même au milieu d'un lot en cours
+            self._git("commit", "-q", "-m", commit_message, "--", *paths)
+            return {"paths": paths}
+
+    def _index_shas(self, paths: list[str]) -> dict:
+        shas = {}
+        for line in self._git("ls-files", "-s", "-z", "--", *paths).split("\0"):
+            if line:
+                info, path = line.split("\t", 1)
+                shas[path] = info.split()[1]
+        return shas
+
+    @contextmanager
+    def _write_lock(self):
+        lock_path = os.path.join(self.root, ".git", "assistants-write.lock")
+        try:
+            if time.time() - os.path.getmtime(lock_path) > WRITE_LOCK_TIMEOUT:
+                os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise ConflictError("409 Conflit : une autre écriture est en cours sur la copie locale")
+        os.close(fd)
+        try:
+            yield
+        finally:
+            os.remove(lock_path)
+
+    @contextmanager
+    def batch(self, commit_message="Commit multiple files"):
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self._batch_message = commit_message
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+        if not self._batch_depth:
+            self._commit_if_needed(self._batch_message)
+
+    def sync(self):
+        """
+        pull --rebase puis push. Si le rebase échoue (ex. conflit sur un fragment d’index modifié
+        par une autre copie), il est annulé : la copie locale reste utilisable et ses commits
+        intacts, et une ConflictError est levée.
+        """
+        try:
+            self._git("pull", "--rebase", self.remote, self.branch)
+        except RuntimeError as e:
+            if not self._rebase_in_progress():
+                raise
+            self._git("rebase", "--abort")
+            raise ConflictError(
+                f"409 Conflit : rebase sur {self.remote}/{self.branch} impossible, annulé ; "
+                f"reconstruire l’index puis relancer la synchronisation ({e})"
+            )
+        self._git("push", self.remote, f"HEAD:{self.branch}")
+
+    def _rebase_in_progress(self) -> bool:
+        git_dir = os.path.join(self.root, ".git")
+        return any(os.path.isdir(os.path.join(git_dir, name)) for name in ("rebase-merge", "rebase-apply"))
+
+    def _commit_if_needed(self, commit_message):
+        if self._batch_depth:
+            return
+        staged = subprocess.run(
+            ["git", "-C", self.root, "diff", "--cached", "--quiet"],
+            capture_output=True
+        )
+        if staged.returncode != 0:
+            self._git("commit", "-q", "-m", commit_message)
+
+    def _git(self, *args) -> str:
+        result = subprocess.run(
+            ["git", "-C", self.root, *args],
+            capture_output=True,
+            text=True,
+            encoding="utf-8"
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Erreur git {' '.join(args)} : {result.stderr.strip()}")
+        return result.stdout
+
+    def _abspath(self, path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if not full_path.startswith(self.root + os.sep) and full_path != self.root:
+            raise ValueError(f"Chemin hors du dépôt : {path}")
+        return full_path
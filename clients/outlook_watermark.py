@@ -0,0 +1,59 @@
+import os
+import json
+import tempfile
+from datetime import datetime
+
+WATERMARK_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class WatermarkStore:
+    """
+    Dernier email synchronisé par compte Outlook ({"received_time", "entry_id"}), dans un fichier
+    JSON partagé par les comptes. ReceivedTime est conservé à la seconde.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self, account_name: str):
+        return self._read().get(account_name)
+
+    def save(self, account_name: str, received_time: datetime, entry_id: str):
+        watermarks = self._read()
+        watermarks[account_name] = {
+            "received_time": received_time.replace(tzinfo=None).strftime(WATERMARK_DATE_FORMAT),
+            "entry_id": entry_id,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(watermarks, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+
+def watermark_time(watermark: dict) -> datetime:
+    return datetime.strptime(watermark["received_time"], WATERMARK_DATE_FORMAT)
+
+
+def is_before_watermark(received: datetime, entry_id: str, watermark: dict) -> bool:
+    """
+    Message déjà synchronisé : le message du watermark lui-même, ou un message reçu strictement
+    avant lui. Un autre message reçu dans la même seconde est retraité (et dédupliqué par id).
+    """
+    if entry_id is not None and entry_id == watermark.get("entry_id"):
+        return True
+    if received is None:
+        return False
+    return received.replace(tzinfo=None, microsecond=0) < watermark_time(watermark)
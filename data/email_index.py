@@ -0,0 +1,125 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+
+def entry_key(entry: dict) -> str:
+    """Clé d’une entrée d’index : son id, à défaut son chemin (fichiers mal formés)."""
+    return entry.get("id") or entry.get("file") or ""
+
+
+class EmailIndex:
+    """
+    Index en mémoire des entrées de l’index (dictionnaires au format du fichier) :
+    accès par id et par chemin en O(1), tableau trié par date pour les requêtes par intervalle,
+    regroupements par auteur et par statut. Se sérialise vers / depuis la liste stockée sur disque.
+    """
+
+    def __init__(self, entries: list[dict] = None):
+        self._by_id = {}
+        self._by_path = {}
+        self._by_date = []  # (date, id) triés ; les dates "AAAA-MM-JJ HH:MM:SS" se comparent comme des chaînes
+        self._by_author = defaultdict(set)
+        self._by_status = defaultdict(set)
+        self._by_fingerprint = {}
+        for entry in entries or []:
+            self.upsert(entry)
+
+    @classmethod
+    def from_list(cls, entries: list[dict]) -> "EmailIndex":
+        return cls(entries)
+
+    def to_list(self) -> list[dict]:
+        return list(self._by_id.values())
+
+    def __contains__(self, entry_id) -> bool:
+        return entry_id in self._by_id
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def get(self, entry_id):
+        return self._by_id.get(entry_id)
+
+    def get_by_path(self, path):
+        return self._by_path.get(path)
+
+    def get_by_fingerprint(self, fingerprint):
+        """Entrée ayant cette empreinte de corps (la première indexée), ou None."""
+        return self._by_fingerprint.get(fingerprint) if fingerprint else None
+
+    def add(self, entry: dict) -> bool:
+        """Ajoute l’entrée si son id est inconnu ; retourne False sinon."""
+        if entry_key(entry) in self._by_id:
+            return False
+        self.upsert(entry)
+        return True
+
+    def upsert(self, entry: dict):
+        entry_id = entry_key(entry)
+        if entry_id in self._by_id:
+            self.remove(entry_id)
+        self._by_id[entry_id] = entry
+        if entry.get("file"):
+            self._by_path[entry["file"]] = entry
+        if entry.get("fingerprint"):
+            self._by_fingerprint.setdefault(entry["fingerprint"], entry)
+        insort(self._by_date, (self._date_key(entry), entry_id))
+        self._by_author[entry.get("author")].add(entry_id)
+        self._by_status[entry.get("status")].add(entry_id)
+
+    def remove(self, entry_id):
+        entry = self._by_id.pop(entry_id, None)
+        if entry is None:
+            return None
+        if self._by_path.get(entry.get("file")) is entry:
+            del self._by_path[entry["file"]]
+        if self._by_fingerprint.get(entry.get("fingerprint")) is entry:
+            del self._by_fingerprint[entry["fingerprint"]]
+        position = bisect_left(self._by_date, (self._date_key(entry), entry_id))
+        if position < len(self._by_date) and self._by_date[position][1] == entry_id:
+            del self._by_date[position]
+        self._by_author[entry.get("author")].discard(entry_id)
+        self._by_status[entry.get("status")].discard(entry_id)
+        return entry
+
+    def remove_path(self, path):
+        entry = self._by_path.get(path)
+        return self.remove(entry_key(entry)) if entry else None
+
+    def set_status(self, entry_id, status: str) -> bool:
+        entry = self._by_id.get(entry_id)
+        if entry is None:
+            return False
+        self._by_status[entry.get("status")].discard(entry_id)
+        entry["status"] = status
+        self._by_status[status].add(entry_id)
+        return True
+
+    def range(self, since: str = None, until: str = None, reverse: bool = False) -> list[dict]:
+        """Entrées dont la date est dans [since, until] (chaînes "AAAA-MM-JJ[ HH:MM:SS]"), triées par date."""
+        start = bisect_left(self._by_date, (since,)) if since else 0
+        # "\uffff" : la borne haute inclut toute la journée / toute la minute indiquée
+        end = bisect_right(self._by_date, (until + "\uffff",)) if until else len(self._by_date)
+        keys = self._by_date[start:end]
+        if reverse:
+            keys = reversed(keys)
+        return [self._by_id[entry_id] for _, entry_id in keys]
+
+    def by_author(self, author: str) -> list[dict]:
+        return self._sorted(self._by_author.get(author, ()))
+
+    def by_status(self, status: str) -> list[dict]:
+        return self._sorted(self._by_status.get(status, ()))
+
+    def ids(self):
+        return self._by_id.keys()
+
+    def _sorted(self, ids) -> list[dict]:
+        return sorted((self._by_id[i] for i in ids), key=self._date_key)
+
+    @staticmethod
+    def _date_key(entry: dict) -> str:
+        return entry.get("date") or ""
@@ -1,6 +1,29 @@
+import re
+import hashlib
 from datetime import datetime
 from typing import List, Optional
 
+
+# En dessous de cette longueur (corps normalisé), pas d’empreinte : les corps vides (invitations,
+# pièces jointes seules) et les réponses courtes (« Merci ») ne sont pas dédupliqués sur leur contenu
+MIN_FINGERPRINT_LENGTH = 80
+
+
+def normalize_body(body: str) -> str:
+    return re.sub(r"\s+", " ", (body or "")).strip().lower()
+
+
+def body_fingerprint(body: str) -> Optional[str]:
+    """
+    Empreinte du corps, insensible aux espaces et à la casse : un même contenu reçu par
+    plusieurs dossiers ou transféré tel quel a la même empreinte. None pour un corps trop court.
+    """
+    normalized = normalize_body(body)
+    if len(normalized) < MIN_FINGERPRINT_LENGTH:
+        return None
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
 class EmailMessage:
     def __init__(
         self,
@@ -10,7 +33,9 @@ class EmailMessage:
         sender: str,
         recipients: List[str],
         source: str = "inbox",
-        id: Optional[str] = None
+        id: Optional[str] = None,
+        entry_id: Optional[str] = None,
+        message_id: Optional[str] = None
     ):
         self.subject = subject
         self.body = body
@@ -18,11 +43,29 @@ class EmailMessage:
         self.sender = sender
         self.recipients = recipients
         self.source = source
+        self.entry_id = entry_id  # EntryID Outlook, s’il est connu
+        self.message_id = message_id  # En-tête Internet Message-ID, s’il est connu
+        self.fingerprint = body_fingerprint(body)
         self.id = id or self._generate_id()
 
     def _generate_id(self):
-        date_str = self.date.strftime("%Y-%m-%d_%H-%M")
-        return f"{date_str}_mail"
+        # Identifiant stable : Message-ID (inchangé d’un dossier à l’autre), sinon EntryID Outlook,
+        # sinon empreinte du corps (complétée de l’expéditeur, de la date et du sujet pour un corps
+        # court) ; deux emails de la même minute ne se confondent plus
+        if self.message_id:
+            source = f"message-id:{self.message_id.strip()}"
+        elif self.entry_id:
+            source = f"entry-id:{self.entry_id}"
+        elif self.fingerprint:
+            source = f"body:{self.fingerprint}"
+        else:
+            source = f"short:{self.sender}|{self.date:%Y-%m-%d %H:%M:%S}|{self.subject}|{normalize_body(self.body)}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def legacy_id(self) -> str:
+        """Identifiant des emails indexés avant les identifiants stables (minute de réception)."""
+        return f"{self.date.strftime('%Y-%m-%d_%H-%M')}_mail"
 
     def __repr__(self):
         return (
@@ -0,0 +1,265 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from data.email_index import entry_key
+
+# Colonnes interrogeables ; l’entrée complète est conservée telle quelle dans `data`
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    title TEXT,
+    date TEXT,
+    author TEXT,
+    recipients TEXT,
+    context TEXT,
+    status TEXT,
+    file TEXT,
+    summary TEXT,
+    body TEXT,
+    fingerprint TEXT,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    pushed_version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_entries_date ON entries(date);
+CREATE INDEX IF NOT EXISTS idx_entries_author ON entries(author);
+CREATE INDEX IF NOT EXISTS idx_entries_status ON entries(status);
+CREATE INDEX IF NOT EXISTS idx_entries_context ON entries(context, date);
+CREATE INDEX IF NOT EXISTS idx_entries_file ON entries(file);
+CREATE INDEX IF NOT EXISTS idx_entries_fingerprint ON entries(fingerprint);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    title, summary, body, author, recipients,
+    content='entries', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, title, summary, body, author, recipients)
+    VALUES (new.rowid, new.title, new.summary, new.body, new.author, new.recipients);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, title, summary, body, author, recipients)
+    VALUES ('delete', old.rowid, old.title, old.summary, old.body, old.author, old.recipients);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, title, summary, body, author, recipients)
+    VALUES ('delete', old.rowid, old.title, old.summary, old.body, old.author, old.recipients);
+    INSERT INTO entries_fts(rowid, title, summary, body, author, recipients)
+    VALUES (new.rowid, new.title, new.summary, new.body, new.author, new.recipients);
+END;
+"""
+
+UPSERT = """
+INSERT INTO entries (id, type, title, date, author, recipients, context, status, file, summary, body, fingerprint, data, version, pushed_version)
+VALUES (:id, :type, :title, :date, :author, :recipients, :context, :status, :file, :summary, :body, :fingerprint, :data, :version, 0)
+ON CONFLICT(id) DO UPDATE SET
+    type = excluded.type, title = excluded.title, date = excluded.date, author = excluded.author,
+    recipients = excluded.recipients, context = excluded.context, status = excluded.status,
+    file = excluded.file, summary = excluded.summary, body = COALESCE(excluded.body, entries.body),
+    fingerprint = excluded.fingerprint, data = excluded.data, version = entries.version + :bump
+"""
+
+
+class MetadataStore:
+    """
+    Copie locale (SQLite) des métadonnées de l’index : colonnes indexées (date, auteur, statut,
+    contexte) et recherche plein texte FTS5 sur le titre, le résumé et le corps.
+    Les écritures locales sont transactionnelles et marquées « à pousser » (version > pushed_version)
+    jusqu’à ce que MetadataSync les ait écrites dans l’index GitHub.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("METADATA_DB_PATH", os.path.join(".cache", "metadata.db"))
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(entries)")}
+            if columns and "fingerprint" not in columns:
+                # Base créée avant l’ajout des empreintes
+                self._conn.execute("ALTER TABLE entries ADD COLUMN fingerprint TEXT")
+            self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Transaction explicite : tout ou rien, y compris pour plusieurs appels imbriqués."""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def upsert(self, entries: list[dict], bodies: dict = None, local: bool = True) -> int:
+        """
+        Ajoute ou remplace des entrées. bodies : {id: corps} pour la recherche plein texte.
+        local=True marque les entrées comme modifiées localement (à pousser vers GitHub).
+        """
+        bodies = bodies or {}
+        with self.transaction():
+            for entry in entries:
+                row = self._row(entry, bodies.get(entry_key(entry)))
+                self._conn.execute(UPSERT, {**row, "version": 1 if local else 0, "bump": 1 if local else 0})
+        return len(entries)
+
+    def replace_remote(self, entries: list[dict], bodies: dict = None):
+        """
+        Aligne la copie locale sur l’index distant, sans toucher aux entrées modifiées localement
+        et pas encore poussées. Les entrées disparues de l’index sont retirées.
+        """
+        bodies = bodies or {}
+        with self.transaction():
+            pending = {row["id"] for row in self._conn.execute("SELECT id FROM entries WHERE version > pushed_version")}
+            for entry in entries:
+                if entry_key(entry) in pending:
+                    continue
+                row = self._row(entry, bodies.get(entry_key(entry)))
+                self._conn.execute(UPSERT, {**row, "version": 0, "bump": 0})
+            remote_ids = [entry_key(entry) for entry in entries]
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS remote_ids (id TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM remote_ids")
+            self._conn.executemany("INSERT OR IGNORE INTO remote_ids VALUES (?)", [(i,) for i in remote_ids])
+            self._conn.execute(
+                "DELETE FROM entries WHERE version = pushed_version AND id NOT IN (SELECT id FROM remote_ids)"
+            )
+
+    def set_status(self, entry_ids: list[str], status: str) -> int:
+        with self.transaction():
+            changed = 0
+            for entry_id in entry_ids:
+                entry = self.get(entry_id)
+                if entry is None or entry.get("status") == status:
+                    continue
+                entry["status"] = status
+                self._conn.execute(
+                    "UPDATE entries SET status = ?, data = ?, version = version + 1 WHERE id = ?",
+                    (status, json.dumps(entry, ensure_ascii=False), entry_id)
+                )
+                changed += 1
+        return changed
+
+    def get(self, entry_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def known_ids(self, entry_ids) -> set:
+        """Identifiants déjà présents parmi ceux donnés (déduplication à la synchronisation)."""
+        entry_ids = list(entry_ids)
+        known = set()
+        with self._lock:
+            for start in range(0, len(entry_ids), 500):
+                chunk = entry_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT id FROM entries WHERE id IN ({placeholders})", chunk)
+                known.update(row["id"] for row in rows)
+        return known
+
+    def known_fingerprints(self, fingerprints) -> set:
+        """Empreintes de corps déjà indexées parmi celles données."""
+        fingerprints = [fingerprint for fingerprint in fingerprints if fingerprint]
+        known = set()
+        with self._lock:
+            for start in range(0, len(fingerprints), 500):
+                chunk = fingerprints[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT fingerprint FROM entries WHERE fingerprint IN ({placeholders})", chunk)
+                known.update(row["fingerprint"] for row in rows)
+        return known
+
+    def query(self, since: str = None, until: str = None, author: str = None, status: str = None,
+              context: str = None, include_archived: bool = True, limit: int = None) -> list[dict]:
+        """Entrées filtrées sur les colonnes indexées, les plus récentes d’abord."""
+        where, params = self._filters(since, until, author, status, context, include_archived)
+        sql = f"SELECT data FROM entries{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY date DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [json.loads(row["data"]) for row in self._conn.execute(sql, params)]
+
+    def search(self, text: str, include_archived: bool = True, context: str = None, limit: int = 200) -> list[dict]:
+        """
+        Recherche plein texte (titre, résumé, corps, auteur, destinataires) : tous les termes
+        doivent apparaître, en préfixe et sans tenir compte des accents. Tri par pertinence.
+        """
+        terms = [term.replace('"', '""') for term in text.split()]
+        if not terms:
+            return self.query(context=context, include_archived=include_archived, limit=limit)
+        match = " ".join(f'"{term}"*' for term in terms)
+        where, params = self._filters(None, None, None, None, context, include_archived, table="e.")
+        sql = (
+            "SELECT e.data FROM entries_fts JOIN entries e ON e.rowid = entries_fts.rowid "
+            f"WHERE entries_fts MATCH ?{''.join(' AND ' + clause for clause in where)} "
+            "ORDER BY bm25(entries_fts), e.date DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, [match, *params, int(limit)])
+            return [json.loads(row["data"]) for row in rows]
+
+    def pending(self) -> list[tuple[dict, int]]:
+        """Entrées modifiées localement et pas encore poussées, avec leur version."""
+        with self._lock:
+            rows = self._conn.execute("SELECT data, version FROM entries WHERE version > pushed_version ORDER BY date")
+            return [(json.loads(row["data"]), row["version"]) for row in rows]
+
+    def mark_pushed(self, versions: dict):
+        """versions : {id: version poussée}. Une entrée modifiée entre-temps reste à pousser."""
+        with self.transaction():
+            self._conn.executemany(
+                "UPDATE entries SET pushed_version = ? WHERE id = ? AND pushed_version < ?",
+                [(version, entry_id, version) for entry_id, version in versions.items()]
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _filters(since, until, author, status, context, include_archived, table=""):
+        where, params = [], []
+        if since:
+            where.append(f"{table}date >= ?")
+            params.append(since)
+        if until:
+            # "\uffff" : la borne haute inclut toute la journée indiquée
+            where.append(f"{table}date <= ?")
+            params.append(until + "\uffff")
+        for column, value in (("author", author), ("status", status), ("context", context)):
+            if value is not None:
+                where.append(f"{table}{column} = ?")
+                params.append(value)
+        if not include_archived:
+            where.append(f"COALESCE({table}status, '') != 'archive'")
+        return where, params
+
+    @classmethod
+    def _row(cls, entry: dict, body: str = None) -> dict:
+        return {
+            "id": entry_key(entry),
+            "type": entry.get("type"),
+            "title": entry.get("title"),
+            "date": entry.get("date"),
+            "author": entry.get("author"),
+            "recipients": " ".join(entry.get("recipients") or []),
+            "context": entry.get("context"),
+            "status": entry.get("status"),
+            "file": entry.get("file"),
+            "summary": entry.get("summary"),
+            "body": body,
+            "fingerprint": entry.get("fingerprint"),
+            "data": json.dumps(entry, ensure_ascii=False),
+        }
@@ -2,24 +2,37 @@ import os
 import json
 from dotenv import load_dotenv
 
-from clients.github_client import GitHubClient
+from clients.content_storage import get_storage
 from clients.email_client import EmailClient
 from services.email_service import EmailService
 from services.email_indexer import EmailIndexer
+from services.metadata_sync import MetadataSync
+from data.metadata_store import MetadataStore
 
 def main():
     # Chargement des variables d'environnement
     load_dotenv()
 
     # Instanciation des clients et services
-    github = GitHubClient()
+    github = get_storage()
     email_client = EmailClient()
-    service = EmailService(github=github, email_client=email_client, context="MH")
-    service.indexer = EmailIndexer(context="MH", github=github)
+    indexer = EmailIndexer(context="MH", github=github)
+    # Déduplication sur la copie SQLite locale ; l’index GitHub est mis à jour à la fin du lot
+    metadata = MetadataSync(MetadataStore(), indexer)
+    service = EmailService(github=github, email_client=email_client, context="MH", metadata=metadata)
+    service.indexer = indexer
 
     print("[INFO] Synchronisation des derniers emails...")
+    github.sync()
+    metadata.pull()
+    # Entrées restées en attente dans .cache/metadata.db après un push en échec
+    metadata.push()
     paths = service.sync_emails(limit=30)
     #paths = service.sync_emails()
+    # Push final au premier plan : un échec est levé au lieu d’attendre une prochaine synchronisation
+    metadata.push()
+    github.sync()
+    print(f"[GPT] Cache de réponses : {service.gpt.metrics['cache_hits']} hit(s), {service.gpt.metrics['cache_misses']} miss(es)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,23 @@
+import argparse
+from dotenv import load_dotenv
+
+from clients.content_storage import get_storage
+from services.email_indexer import EmailIndexer
+
+def main():
+    parser = argparse.ArgumentParser(description="Range les emails existants dans des dossiers AAAA/MM (un seul commit).")
+    parser.add_argument("--context", default="MH")
+    args = parser.parse_args()
+
+    load_dotenv()
+    github = get_storage()
+    github.sync()
+    indexer = EmailIndexer(github=github, context=args.context)
+    moves = indexer.migrate_to_partitioned_layout()
+    github.sync()
+
+    for old_path, new_path in moves.items():
+        print(f"{old_path} -> {new_path}")
+
+if __name__ == "__main__":
+    main()
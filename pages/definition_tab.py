@@ -1,7 +1,8 @@
 import streamlit as st
 from clients.gpt_client import GPTClient
 
-def generate_cpn_from_empathy_map(empathy_map: str) -> str:
+def generate_cpn_from_empathy_map(empathy_map: str):
+    """Produit les CPN au fil de la génération (à afficher avec st.write_stream)."""
     gpt = GPTClient()
 
     prompt = f"""
@@ -27,7 +28,7 @@ Termine par une synthèse argumentée expliquant pourquoi ces CPN sont prioritai
 """
 
     try:
-        return gpt.complete(
+        yield from gpt.stream(
             prompt=prompt,
             system_prompt="Tu es expert en Design Thinking. Structure ta réponse avec des bullets, des sauts de ligne et une synthèse claire.",
             temperature=0.5,
@@ -35,7 +36,7 @@ Termine par une synthèse argumentée expliquant pourquoi ces CPN sont prioritai
             timeout=60.0
         )
     except Exception as e:
-        return f"❌ Erreur lors de la génération des CPN : {e}"
+        yield f"\n\n❌ Erreur lors de la génération des CPN : {e}"
 
 def render():
     st.header("Étape 2 : Définition")
@@ -55,9 +56,9 @@ def render():
     st.markdown("## 2️⃣ Générer les CPN automatiquement")
 
     if st.button("💡 Générer des CPN à partir de la carte d’empathie"):
-        with st.spinner("Analyse de la carte et génération en cours…"):
-            st.session_state.cpn_output = generate_cpn_from_empathy_map(st.session_state.empathy_map)
-
-    if st.session_state.cpn_output:
+        # Le texte s’affiche dès les premiers tokens reçus
+        st.markdown("### ✨ CPN proposés")
+        st.session_state.cpn_output = st.write_stream(generate_cpn_from_empathy_map(st.session_state.empathy_map))
+    elif st.session_state.cpn_output:
         st.markdown("### ✨ CPN proposés")
         st.markdown(st.session_state.cpn_output)
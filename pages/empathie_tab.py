@@ -16,13 +16,9 @@ def extract_text(file):
     else:
         return ""
 
-def generate_verbatims(transcript_text: str) -> str:
-    if not transcript_text.strip():
-        return "⛔ Transcription vide. Aucun verbatim généré."
-
-    transcript_text = transcript_text[:15000]
-    gpt = GPTClient()
+VERBATIMS_SYSTEM_PROMPT = "Tu es un expert en Design Thinking et en analyse d’entretiens utilisateurs."
 
+def verbatims_request(transcript_text: str) -> dict:
     prompt = f"""
 📌 Ta mission :
 Sélectionner 2 à 3 verbatims forts parmi les phrases entendues ou prononcées dans la scène, en te concentrant sur les aspects suivants :
@@ -39,19 +35,54 @@ Pour chaque verbatim sélectionné, indique :
 👉 Voici la transcription à analyser :
 {transcript_text.strip()}
 """
+    return {
+        "prompt": prompt,
+        "system_prompt": VERBATIMS_SYSTEM_PROMPT,
+        "temperature": 0.5,
+        "max_tokens": 1000,
+        "timeout": 60.0
+    }
+
+def verbatims_merge_request(partials: list[str]) -> dict:
+    selections = "\n\n".join(f"--- Partie {i} ---\n{partial.strip()}" for i, partial in enumerate(partials, 1))
+    prompt = f"""
+Une longue transcription a été analysée partie par partie. Voici, dans l’ordre, les verbatims retenus pour chaque partie.
+
+📌 Ta mission :
+Sélectionner parmi eux les 2 à 3 verbatims les plus forts pour l’ensemble de la scène, en conservant pour chacun :
+- Le verbatim exact
+- Qui parle
+- À quel moment du parcours cela se situe
+- Pourquoi ce verbatim est marquant
+
+{selections}
+"""
+    return {
+        "prompt": prompt,
+        "system_prompt": VERBATIMS_SYSTEM_PROMPT,
+        "temperature": 0.5,
+        "max_tokens": 1000,
+        "timeout": 60.0
+    }
+
+def generate_verbatims(transcript_text: str):
+    """
+    Produit les verbatims au fil de la génération (à afficher avec st.write_stream).
+    Une transcription longue est analysée par parties en parallèle, puis les sélections fusionnées.
+    """
+    if not transcript_text.strip():
+        yield "⛔ Transcription vide. Aucun verbatim généré."
+        return
+
+    gpt = GPTClient()
 
     try:
-        return gpt.complete(
-            prompt=prompt,
-            system_prompt="Tu es un expert en Design Thinking et en analyse d’entretiens utilisateurs.",
-            temperature=0.5,
-            max_tokens=1000,
-            timeout=60.0
-        )
+        yield from gpt.map_reduce(transcript_text, verbatims_request, verbatims_merge_request, stream=True)
     except Exception as e:
-        return f"❌ Erreur lors de la génération des verbatims : {e}"
+        yield f"\n\n❌ Erreur lors de la génération des verbatims : {e}"
 
-def generate_empathy_map(verbatims: str) -> str:
+def generate_empathy_map(verbatims: str):
+    """Produit la carte d’empathie au fil de la génération (à afficher avec st.write_stream)."""
     gpt = GPTClient()
 
     prompt = f"""
@@ -71,7 +102,7 @@ Voici le contenu à analyser :
 """
 
     try:
-        return gpt.complete(
+        yield from gpt.stream(
             prompt=prompt,
             system_prompt="Tu es un expert UX. Ton format doit être clair, synthétique et bien structuré.",
             temperature=0.5,
@@ -79,7 +110,7 @@ Voici le contenu à analyser :
             timeout=60.0
         )
     except Exception as e:
-        return f"❌ Erreur lors de la génération de la carte d’empathie : {e}"
+        yield f"\n\n❌ Erreur lors de la génération de la carte d’empathie : {e}"
 
 # ---------- Vue Empathie ----------
 
@@ -107,14 +138,17 @@ def render():
     st.markdown("---")
     st.markdown("## 2️⃣ Extraire des verbatims avec l’IA")
 
+    generated = False
     if st.session_state.transcript_text:
         if st.button("🔍 Générer les verbatims à partir du transcript"):
-            with st.spinner("Analyse en cours…"):
-                st.session_state.verbatims = generate_verbatims(st.session_state.transcript_text)
+            # Le texte s’affiche dès les premiers tokens reçus
+            st.markdown("### 🎤 Verbatims extraits")
+            st.session_state.verbatims = st.write_stream(generate_verbatims(st.session_state.transcript_text))
+            generated = True
     else:
         st.info("👉 Veuillez importer une transcription avant de lancer l’analyse.")
 
-    if st.session_state.verbatims:
+    if st.session_state.verbatims and not generated:
         st.markdown("### 🎤 Verbatims extraits")
         st.markdown(st.session_state.verbatims)
 
@@ -122,12 +156,14 @@ def render():
     st.markdown("---")
     st.markdown("## 3️⃣ Carte d’empathie générée automatiquement")
 
+    generated = False
     if st.session_state.verbatims:
         if st.button("🧠 Générer la carte d’empathie"):
-            with st.spinner("Génération de la carte d’empathie…"):
-                st.session_state.empathy_map = generate_empathy_map(st.session_state.verbatims)
+            st.session_state.empathy_map = st.write_stream(generate_empathy_map(st.session_state.verbatims))
+            generated = True
 
     if st.session_state.empathy_map:
-        st.markdown(st.session_state.empathy_map)
+        if not generated:
+            st.markdown(st.session_state.empathy_map)
     else:
         st.info("👉 Générez d’abord les verbatims pour débloquer cette étape.")
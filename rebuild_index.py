@@ -0,0 +1,27 @@
+import argparse
+from datetime import datetime
+from dotenv import load_dotenv
+
+from clients.content_storage import get_storage
+from services.email_indexer import EmailIndexer
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def main():
+    parser = argparse.ArgumentParser(description="Met à jour l'index des emails (incrémental par défaut).")
+    parser.add_argument("--context", default="MH")
+    parser.add_argument("--full", action="store_true", help="relit tous les fichiers au lieu des seuls fichiers modifiés")
+    parser.add_argument("--since", type=parse_date, help="AAAA-MM-JJ : ne relit que les partitions à partir de cette date")
+    parser.add_argument("--until", type=parse_date, help="AAAA-MM-JJ : ne relit que les partitions jusqu'à cette date")
+    args = parser.parse_args()
+
+    load_dotenv()
+    github = get_storage()
+    github.sync()
+    indexer = EmailIndexer(github=github, context=args.context)
+    indexer.run(since=args.since, until=args.until, full=args.full)
+    github.sync()
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,34 @@
 import json
 import re
 from pathlib import Path
+from datetime import date
 from clients.gpt_client import GPTClient
-from clients.github_client import GitHubClient
+from clients.content_storage import ContentStorage
 from data.action import Action
+from services.content_layout import list_partitioned
+from utils.text_chunker import estimate_tokens, split_text
 
 
 class BacklogBuilderFromEmails:
     def __init__(
         self,
-        github: GitHubClient,
+        github: ContentStorage,
         source_dirs: list[str],  # ⬅️ Liste des dossiers (ex: ["MH/emails", "MH/transcriptions"])
         backlog_path: str,
-        prompt_path: str = "prompts/extraction_actions.prompt"
+        prompt_path: str = "prompts/extraction_actions.prompt",
+        since: date = None,
+        until: date = None,
+        max_workers: int = 4
     ):
         self.github = github
         self.source_dirs = source_dirs
         self.backlog_path = backlog_path
         self.prompt_path = prompt_path
+        # Intervalle optionnel : seules les partitions mensuelles concernées sont lues
+        self.since = since
+        self.until = until
+        # Appels GPT simultanés pour l’extraction des actions
+        self.max_workers = max_workers
         self.gpt = GPTClient()
         self.prompt_template = self._load_prompt_template()
 
@@ -26,34 +37,68 @@ class BacklogBuilderFromEmails:
             return f.read()
 
     def _load_all_markdown_emails(self) -> list[tuple[str, str]]:
-        markdown_files = []
-        for directory in self.source_dirs:
-            fichiers = self.github.list_files(directory)
-            markdown_files.extend(f for f in fichiers if f.endswith(".md"))
+        if self.since is None and self.until is None:
+            files = self.github.read_prefixes(self.source_dirs, suffix=".md")
+        else:
+            paths = [
+                path
+                for directory in self.source_dirs
+                for path in list_partitioned(self.github, directory, self.since, self.until)
+                if path.endswith(".md")
+            ]
+            files = self.github.get_files(paths)
 
         emails = []
-        for path in markdown_files:
-            content = self.github.get_file(path)
+        for path, content, error in files:
+            if error:
+                print(f"[WARN] Lecture impossible de {path} : {error}")
+                continue
             emails.append((path, content))
+        # Ordre stable malgré les téléchargements concurrents
+        emails.sort(key=lambda item: item[0])
         return emails
 
     def _build_prompt(self, markdown_content: str) -> str:
         return self.prompt_template.replace("{{markdown}}", markdown_content)
 
+    def _split_content(self, markdown_content: str) -> list[str]:
+        """
+        Découpe un contenu trop long pour un seul appel en parties (paragraphes, tours de parole),
+        chacune précédée de l’en-tête YAML pour garder le contexte (sujet, date, auteur).
+        """
+        if estimate_tokens(self._build_prompt(markdown_content)) <= self.gpt.chunk_tokens:
+            return [markdown_content]
+        header, body = "", markdown_content
+        if markdown_content.startswith("---"):
+            parts = markdown_content.split("---", 2)
+            if len(parts) == 3:
+                header, body = f"---{parts[1]}---\n\n", parts[2]
+        budget = self.gpt.chunk_tokens - estimate_tokens(self._build_prompt(header))
+        return [header + chunk for chunk in split_text(body, max(budget, 500))] or [markdown_content]
+
     def extract_all_actions(self) -> list[Action]:
         actions: list[Action] = []
         emails = self._load_all_markdown_emails()
 
+        # Une requête par partie : les actions des parties d’un même contenu sont réunies
+        sources = []
+        extraction_requests = []
         for path, content in emails:
-            prompt = self._build_prompt(content)
+            for part in self._split_content(content):
+                sources.append(path)
+                extraction_requests.append({
+                    "prompt": self._build_prompt(part),
+                    "system_prompt": "Tu es un assistant rigoureux qui extrait des actions dans des emails professionnels, uniquement en JSON.",
+                    "temperature": 0.3,
+                    "max_tokens": 1200,
+                    "timeout": 60
+                })
+        # Appels en parallèle (bornés et limités en RPM / TPM), réponses dans l’ordre des emails
+        for position, response, error in self.gpt.complete_many(extraction_requests, max_workers=self.max_workers):
+            path = sources[position]
             try:
-                response = self.gpt.complete(
-                    prompt=prompt,
-                    system_prompt="Tu es un assistant rigoureux qui extrait des actions dans des emails professionnels, uniquement en JSON.",
-                    temperature=0.3,
-                    max_tokens=1200,
-                    timeout=60
-                )
+                if error:
+                    raise error
                 match = re.search(r"\[\s*{.*?}\s*\]", response, re.DOTALL)
                 if match:
                     parsed = json.loads(match.group())
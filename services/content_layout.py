@@ -0,0 +1,66 @@
+import re
+from datetime import date, datetime
+
+# Les emails sont rangés par mois : {context}/emails/AAAA/MM/AAAA-MM-JJ_{id}.md
+PARTITION_PATTERN = re.compile(r"/(\d{4})/(\d{2})/[^/]+$")
+FILENAME_DATE_PATTERN = re.compile(r"(?:^|/)(\d{4})-(\d{2})-(\d{2})[^/]*$")
+
+
+def email_path(context: str, email) -> str:
+    return f"{email_partition(context, email.date)}/{email.date.strftime('%Y-%m-%d')}_{email.id}.md"
+
+
+def email_partition(context: str, day: date) -> str:
+    return f"{context}/emails/{day.strftime('%Y')}/{day.strftime('%m')}"
+
+
+def partition_prefixes(base_dir: str, since: date = None, until: date = None) -> list[str]:
+    """Préfixes mensuels AAAA/MM couvrant l'intervalle [since, until] (until par défaut : aujourd'hui)."""
+    base_dir = base_dir.rstrip("/")
+    until = until or datetime.now().date()
+    year, month = since.year, since.month
+    prefixes = []
+    while (year, month) <= (until.year, until.month):
+        prefixes.append(f"{base_dir}/{year:04d}/{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return prefixes
+
+
+def path_month(path: str):
+    """(année, mois) d'un fichier, d'après sa partition ou la date en tête du nom de fichier."""
+    match = PARTITION_PATTERN.search(path) or FILENAME_DATE_PATTERN.search(path)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def is_partitioned(path: str) -> bool:
+    return PARTITION_PATTERN.search(path) is not None
+
+
+def list_partitioned(storage, base_dir: str, since: date = None, until: date = None) -> list[str]:
+    """
+    Liste les fichiers de `base_dir` en ne parcourant que les partitions mensuelles de l'intervalle.
+    Sans intervalle, tout le dossier est listé. Avec seulement `until`, ou pour un dossier sans
+    partition (ancien format à plat), le dossier est listé en une fois puis filtré sur le mois.
+    """
+    if since is None and until is None:
+        return list(storage.list_tree(base_dir))
+
+    if since is not None:
+        paths = []
+        for prefix in partition_prefixes(base_dir, since, until):
+            try:
+                paths.extend(storage.list_tree(prefix))
+            except (RuntimeError, FileNotFoundError):
+                continue  # Mois sans email
+        if paths:
+            return paths
+
+    low = (since.year, since.month) if since else None
+    until = until or datetime.now().date()
+    high = (until.year, until.month)
+    return [
+        path for path in storage.list_tree(base_dir)
+        if path_month(path) is None or ((low is None or low <= path_month(path)) and path_month(path) <= high)
+    ]
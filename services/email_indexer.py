@@ -1,116 +1,487 @@
 import os
 import json
+import time
+import random
 import yaml
-from clients.github_client import GitHubClient
-from data.email_message import EmailMessage
-from datetime import datetime
+from clients.content_storage import ConflictError, ContentStorage, git_blob_sha
+from data.email_message import EmailMessage, body_fingerprint
+from data.email_index import EmailIndex, entry_key
+from datetime import date, datetime
+from services.content_layout import is_partitioned, list_partitioned, path_month
+
+# Index partitionné : un manifeste + un fichier JSONL par mois ({context}/index/AAAA-MM.jsonl)
+UNDATED_SHARD = "sans-date"
+# Écritures optimistes : tentatives avant abandon, et délai de base (s) entre deux tentatives
+MAX_WRITE_ATTEMPTS = 5
+WRITE_RETRY_DELAY = 0.2
+
+
+def shard_key(date_str) -> str:
+    if isinstance(date_str, str) and len(date_str) >= 7 and date_str[4] == "-" and date_str[:4].isdigit():
+        return date_str[:7]
+    return UNDATED_SHARD
+
 
 class EmailIndexer:
-    def __init__(self, github: GitHubClient, context: str = "MH"):
+    def __init__(self, github: ContentStorage, context: str = "MH"):
         self.github = github
         self.context = context
         self.emails_dir = f"{context}/emails"
+        self.index_dir = f"{context}/index"
+        self.manifest_path = f"{self.index_dir}/manifest.json"
+        # SHA de blob de chaque fichier indexé, pour les reconstructions incrémentales
+        self.sources_path = f"{self.index_dir}/sources.json"
+        # Ancien format (un seul fichier JSON), relu tant que l’index n’a pas été partitionné
         self.index_path = f"{context}/index.json"
 
-    def get_index(self) -> list:
+    def get_index(self, since: date = None, until: date = None) -> list:
+        """Vue fusionnée de l’index pour l’affichage ; une erreur de lecture donne une liste vide."""
         try:
-            raw = self.github.get_file(self.index_path)
-            return json.loads(raw)
+            return self.read_index(since, until, create=True)
         except Exception as e:
-            if "404" in str(e):
-                print(f"[INFO] Aucun index trouvé. Création d’un nouveau fichier {self.index_path}.")
-                self.create_empty_index()
-                return []
             print(f"[WARN] Index introuvable ou corrompu : {e}")
             return []
 
+    def read_index(self, since: date = None, until: date = None, create: bool = False) -> list:
+        """Vue fusionnée de l’index (mois de [since, until]) ; toute erreur de lecture est levée."""
+        manifest = self.get_manifest()
+        if manifest is None:
+            legacy = self._get_legacy_index()
+            if legacy is None:
+                if create:
+                    print(f"[INFO] Aucun index trouvé. Création d’un nouvel index dans {self.index_dir}.")
+                    self.create_empty_index()
+                return []
+            return [entry for entry in legacy if self._shard_in_range(shard_key(entry.get("date")), since, until)]
+
+        keys = [key for key in sorted(manifest["shards"]) if self._shard_in_range(key, since, until)]
+        shards = self._read_shards(manifest, keys)
+        return [entry for key in keys for entry in shards.get(key, [])]
+
+    def load_index(self, since: date = None, until: date = None) -> EmailIndex:
+        return EmailIndex.from_list(self.get_index(since, until))
+
+    def get_manifest(self):
+        try:
+            return json.loads(self.github.get_file(self.manifest_path))
+        except Exception as e:
+            if isinstance(e, FileNotFoundError) or "404" in str(e):
+                return None
+            raise
+
     def create_empty_index(self):
-        empty_index = []
-        content = json.dumps(empty_index, indent=2, ensure_ascii=False)
-        self.github.upload_file(
-            self.index_path,
-            content,
-            commit_message=f"Création initiale de l’index pour le contexte {self.context}"
+        self._rebuild_index([], set(), commit_message=f"Création initiale de l’index pour le contexte {self.context}")
+        print(f"[INDEX] Index {self.manifest_path} créé avec succès.")
+
+    def update_index_with_email(self, email: EmailMessage, path: str, summary: str = None):
+        self.update_index_with_emails([(email, path, summary)])
+
+    def update_index_with_emails(self, items: list[tuple[EmailMessage, str, str]]) -> int:
+        """Ajoute un lot d’emails à l’index en un seul commit ; retourne le nombre ajouté."""
+        if not items:
+            return 0
+        try:
+            entries = []
+            for email, path, summary in items:
+                if summary is None:
+                    summary = self._read_summary(path)
+                entries.append(self.entry_from_email(email, path, summary))
+            added = self.add_entries(entries)
+            for entry in added:
+                print(f"[INDEX] Ajouté : {entry['title']}")
+            return len(added)
+        except Exception as e:
+            print(f"[ERREUR INDEX] Mise à jour échouée pour {len(items)} email(s) : {e}")
+            raise
+
+    def add_entries(self, entries: list[dict], commit_message: str = None) -> list[dict]:
+        """Ajoute les entrées absentes de l’index ; retourne les entrées ajoutées."""
+        added = []
+
+        def build(manifest, read_shards):
+            added.clear()
+            keys = {shard_key(entry.get("date")) for entry in entries}
+            shards = read_shards(sorted(keys))
+            loaded = EmailIndex([entry for shard in shards.values() for entry in shard])
+            changed = {}
+            for entry in entries:
+                duplicate = loaded.get_by_fingerprint(entry.get("fingerprint"))
+                if duplicate is not None and entry_key(duplicate) != entry_key(entry):
+                    print(f"[SKIP] Contenu déjà indexé sous {duplicate.get('file')} : {entry.get('title')}")
+                    continue
+                if not loaded.add(entry):
+                    print(f"[SKIP] Entrée déjà présente dans l’index : {entry.get('title')}")
+                    continue
+                key = shard_key(entry.get("date"))
+                changed[key] = shards.setdefault(key, [])
+                changed[key].append(entry)
+                added.append(entry)
+            return self._shard_files(manifest, changed) if changed else {}, set()
+
+        if not entries:
+            return []
+        message = commit_message or (
+            f"Ajout {entries[0].get('title')} dans index" if len(entries) == 1
+            else f"Ajout de {len(entries)} entrées dans index"
         )
-        print(f"[INDEX] Fichier {self.index_path} créé avec succès.")
+        self._commit_index(build, commit_message=message)
+        return added
+
+    def upsert_entries(self, entries: list[dict], commit_message: str = None) -> int:
+        """Ajoute ou remplace des entrées ; retourne le nombre d’entrées écrites."""
+        written = 0
+
+        def build(manifest, read_shards):
+            nonlocal written
+            keys = {shard_key(entry.get("date")) for entry in entries}
+            shards = read_shards(sorted(keys & set(manifest["shards"])))
+            index = EmailIndex([entry for shard in shards.values() for entry in shard])
+            changed = set()
+            written = 0
+            for entry in entries:
+                previous = index.get(entry_key(entry))
+                if previous == entry:
+                    continue
+                if previous is not None:
+                    changed.add(shard_key(previous.get("date")))
+                index.upsert(entry)
+                changed.add(shard_key(entry.get("date")))
+                written += 1
+            by_key = {key: [] for key in changed}
+            for entry in index:
+                key = shard_key(entry.get("date"))
+                if key in by_key:
+                    by_key[key].append(entry)
+            return self._shard_files(manifest, by_key) if changed else {}, set()
+
+        if not entries:
+            return 0
+        self._commit_index(build, commit_message=commit_message or f"Mise à jour de {len(entries)} entrée(s) de l’index")
+        return written
+
+    def set_status(self, entry_ids: list[str], status: str) -> int:
+        """Change le statut d’entrées existantes ; seuls les fichiers mensuels concernés sont réécrits."""
+        changed_count = 0
+
+        def build(manifest, read_shards):
+            nonlocal changed_count
+            shards = read_shards(sorted(manifest["shards"]))
+            index = EmailIndex([entry for shard in shards.values() for entry in shard])
+            changed = set()
+            for entry_id in entry_ids:
+                entry = index.get(entry_id)
+                if entry is None or entry.get("status") == status:
+                    continue
+                index.set_status(entry_id, status)
+                changed.add(shard_key(entry.get("date")))
+            changed_count = len(changed)
+            return self._shard_files(manifest, {key: shards[key] for key in changed}) if changed else {}, set()
 
-    def update_index_with_email(self, email: EmailMessage, path: str):
+        self._commit_index(build, commit_message=f"Statut « {status} » pour {len(entry_ids)} email(s)")
+        return changed_count
+
+    def _read_summary(self, path: str) -> str:
         try:
-            current_index = self.get_index()
+            content = self.github.get_file(path)
+            parts = content.split("---")
+            if len(parts) >= 3:
+                metadata = yaml.safe_load(parts[1])
+                return metadata.get("summary", "")
+        except Exception:
+            pass
+        return ""
 
-            if any(meta.get("id") == email.id for meta in current_index):
-                print(f"[SKIP] Email déjà présent dans l’index : {email.subject}")
-                return
+    def entry_from_email(self, email: EmailMessage, path: str, summary: str) -> dict:
+        return {
+            "id": email.id,
+            "type": "email",
+            "title": email.subject,
+            "source": email.source or "Outlook",
+            "date": email.date.strftime('%Y-%m-%d %H:%M:%S'),  # ✅ Convertir datetime en string
+            "author": email.sender,
+            "recipients": email.recipients,
+            "context": self.context,
+            "tags": [],
+            "status": "en_cours",
+            "file": path,
+            "summary": summary,
+            "entry_id": email.entry_id,
+            "fingerprint": email.fingerprint
+        }
+
+    # --- Stockage partitionné ---
+
+    def _shard_path(self, key: str) -> str:
+        return f"{self.index_dir}/{key}.jsonl"
+
+    @staticmethod
+    def _shard_in_range(key: str, since: date = None, until: date = None) -> bool:
+        if key == UNDATED_SHARD:
+            return since is None and until is None
+        if since and key < since.strftime('%Y-%m'):
+            return False
+        if until and key > until.strftime('%Y-%m'):
+            return False
+        return True
+
+    def _read_shards(self, manifest: dict, keys: list[str]) -> dict:
+        paths = {manifest["shards"][key]["path"]: key for key in keys if key in manifest["shards"]}
+        shards = {}
+        for path, content, error in self.github.get_files(list(paths)):
+            if error:
+                raise RuntimeError(f"Lecture de {path} impossible : {error}")
+            shards[paths[path]] = [json.loads(line) for line in content.splitlines() if line.strip()]
+        return shards
+
+    def _shard_files(self, manifest: dict, shards: dict) -> dict:
+        """Contenu des fichiers mensuels donnés et du manifeste mis à jour ({chemin: contenu})."""
+        files = {}
+        for key, entries in sorted(shards.items()):
+            path = self._shard_path(key)
+            files[path] = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+            manifest["shards"][key] = {"path": path, "count": len(entries)}
+        files[self.manifest_path] = json.dumps(manifest, indent=2, ensure_ascii=False, sort_keys=True)
+        return files
+
+    def _index_files(self, entries: list, previous: dict) -> tuple[dict, set]:
+        """Index complet (tous les mois) et fichiers mensuels devenus inutiles."""
+        shards = {}
+        for entry in entries:
+            shards.setdefault(shard_key(entry.get("date")), []).append(entry)
+        files = self._shard_files({"version": 1, "shards": {}}, shards)
+        deletions = {
+            shard["path"] for key, shard in (previous or {}).get("shards", {}).items() if key not in shards
+        }
+        return files, deletions
 
+    def _rebuild_index(self, entries: list, reread: set, commit_message: str, extra_files: dict = None):
+        """Reconstruit l’index par un commit conditionnel, fusionné avec l’index courant."""
+        def build(manifest, read_shards):
+            shards = read_shards(sorted(manifest["shards"]))
+            # Listé après la lecture de l’index : le fichier d’une entrée lue est déjà committé
             try:
-                content = self.github.get_file(path)
-                parts = content.split("---")
-                if len(parts) >= 3:
-                    metadata = yaml.safe_load(parts[1])
-                    summary = metadata.get("summary", "")
-                else:
-                    summary = ""
-            except Exception:
-                summary = ""
-
-            metadata = {
-                "id": email.id,
-                "type": "email",
-                "title": email.subject,
-                "source": email.source or "Outlook",
-                "date": email.date.strftime('%Y-%m-%d %H:%M:%S'),  # ✅ Convertir datetime en string
-                "author": email.sender,
-                "recipients": email.recipients,
-                "context": self.context,
-                "tags": [],
-                "status": "en_cours",
-                "file": path,
-                "summary": summary
-            }
-
-            current_index.append(metadata)
-            content = json.dumps(current_index, indent=2, ensure_ascii=False)
-            self.github.upload_file(self.index_path, content, commit_message=f"Ajout {email.subject} dans index")
-            print(f"[INDEX] Ajouté : {email.subject}")
+                present = self.github.get_file_shas(self.emails_dir)
+            except FileNotFoundError:
+                present = {}
+            index = EmailIndex([entry for shard in shards.values() for entry in shard])
+            for entry in list(index):
+                path = entry.get("file") or ""
+                if path.startswith(self.emails_dir + "/") and (path in reread or path not in present):
+                    index.remove(entry_key(entry))
+            for entry in entries:
+                index.upsert(entry)
+            merged = sorted(index.to_list(), key=lambda entry: entry.get("file") or "")
+            files, deletions = self._index_files(merged, manifest)
+            return {**files, **(extra_files or {})}, deletions
 
+        self._commit_index(build, commit_message=commit_message)
+
+    def _commit_index(self, build, commit_message: str):
+        """Commit conditionnel de `build(manifest, read_shards)`, relu et réessayé sur ConflictError."""
+        for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+            try:
+                shas = self._index_shas()
+                if self.manifest_path not in shas and self._partition_legacy_index(shas):
+                    shas = self._index_shas()
+                manifest = self.get_manifest() if self.manifest_path in shas else {"version": 1, "shards": {}}
+                files, deletions = build(manifest, lambda keys: self._read_shards(manifest, keys))
+                if not files and not deletions:
+                    return None
+                expected = {
+                    path: shas.get(path) for path in set(files) | set(deletions)
+                    if path.startswith(self.index_dir + "/")
+                }
+                return self.github.commit_files(
+                    files, commit_message, deletions=deletions, expected_shas=expected
+                )
+            except ConflictError as e:
+                if attempt == MAX_WRITE_ATTEMPTS:
+                    raise
+                print(f"[INDEX] Écriture concurrente ({e}), nouvelle tentative {attempt + 1}/{MAX_WRITE_ATTEMPTS}")
+                time.sleep(random.uniform(0, WRITE_RETRY_DELAY * 2 ** attempt))
+
+    def _index_shas(self) -> dict:
+        try:
+            return self.github.get_file_shas(self.index_dir)
+        except FileNotFoundError:
+            return {}
+
+    def _partition_legacy_index(self, shas: dict) -> bool:
+        """Première écriture : conversion de l’ancien index.json (s’il existe) en fichiers mensuels."""
+        legacy = self._get_legacy_index()
+        if legacy is None:
+            return False
+        files, _ = self._index_files(legacy, None)
+        expected = {path: shas.get(path) for path in files}
+        self.github.commit_files(
+            files, "Partitionnement de l’index par mois", deletions={self.index_path}, expected_shas=expected
+        )
+        return True
+
+    def _get_legacy_index(self):
+        try:
+            return json.loads(self.github.get_file(self.index_path))
         except Exception as e:
-            print(f"[ERREUR INDEX] Mise à jour échouée pour {email.subject} : {e}")
+            if isinstance(e, FileNotFoundError) or "404" in str(e):
+                return None
+            raise
+
+    def list_email_paths(self, since: date = None, until: date = None) -> list[str]:
+        return list_partitioned(self.github, self.emails_dir, since, until)
 
-    def run(self):
-        print(f"[INFO] Reconstruction complète de l'index à partir de {self.emails_dir}")
+    def run(self, since: date = None, until: date = None, full: bool = False):
+        """Met à jour l’index depuis les fichiers Markdown (incrémental, par intervalle ou complet)."""
+        partial = since is not None or until is not None
+        if not full and not partial:
+            sources = self.get_sources()
+            if sources is not None:
+                return self._run_incremental(sources)
+
+        scope = f" ({since or '…'} → {until or '…'})" if partial else ""
+        print(f"[INFO] Reconstruction de l'index à partir de {self.emails_dir}{scope}")
         try:
-            paths = self.github.list_files(self.emails_dir)
-            entries = []
-            for path in paths:
-                try:
-                    content = self.github.get_file(path)
-                    parts = content.split("---")
-                    if len(parts) >= 3:
-                        metadata = yaml.safe_load(parts[1])
-                        # S’assurer que la date est une chaîne bien formatée
-                        date_str = metadata.get("date")
-                        if isinstance(date_str, datetime):
-                            date_str = date_str.strftime('%Y-%m-%d %H:%M:%S')
-
-                        entries.append({
-                            "id": metadata.get("id"),
-                            "type": metadata.get("type", "email"),
-                            "title": metadata.get("title"),
-                            "source": metadata.get("source"),
-                            "date": date_str,
-                            "author": metadata.get("author"),
-                            "recipients": metadata.get("recipients", []),
-                            "context": metadata.get("context", self.context),
-                            "tags": metadata.get("tags", []),
-                            "status": metadata.get("status", "en_cours"),
-                            "file": path,
-                            "summary": metadata.get("summary", "")
-                        })
-                except Exception as e:
-                    print(f"[WARN] Erreur de lecture fichier {path} : {e}")
-
-            content = json.dumps(entries, indent=2, ensure_ascii=False)
-            self.github.upload_file(self.index_path, content, commit_message=f"Reconstruction complète de l’index")
+            if partial:
+                files = self.github.get_files(self.list_email_paths(since, until))
+            else:
+                files = self.github.read_prefixes([self.emails_dir])
+            entries, shas = self._parse_files(files)
+
+            self._rebuild_index(
+                entries,
+                set(shas),
+                commit_message=f"Reconstruction de l’index{scope}",
+                extra_files=None if partial else {self.sources_path: self._sources_content(shas)}
+            )
             print(f"[INDEX] {len(entries)} fichiers indexés avec succès.")
         except Exception as e:
             print(f"[ERREUR] Impossible de reconstruire l’index : {e}")
+
+    def _run_incremental(self, sources: dict):
+        print(f"[INFO] Mise à jour incrémentale de l'index à partir de {self.emails_dir}")
+        try:
+            current = self.github.get_file_shas(self.emails_dir)
+            changed = [path for path, sha in current.items() if sources.get(path) != sha]
+            deleted = set(sources) - set(current)
+            if not changed and not deleted:
+                print("[INDEX] Index déjà à jour.")
+                return
+
+            entries, shas = self._parse_files(self.github.get_files(changed))
+            # Fichiers illisibles : on garde l’ancien SHA pour les retenter au prochain passage
+            reread = set(shas)
+            shas = {**{path: sha for path, sha in current.items() if path not in changed}, **shas}
+
+            message = f"Mise à jour de l’index ({len(changed)} modifié(s), {len(deleted)} supprimé(s))"
+            self._rebuild_index(
+                entries,
+                reread,
+                commit_message=message,
+                extra_files={self.sources_path: self._sources_content(shas)}
+            )
+            print(f"[INDEX] {len(changed)} fichier(s) relu(s), {len(deleted)} retiré(s).")
+        except Exception as e:
+            print(f"[ERREUR] Impossible de mettre à jour l’index : {e}")
+
+    def _parse_files(self, files) -> tuple[list, dict]:
+        entries = []
+        shas = {}
+        for path, content, error in files:
+            if error:
+                print(f"[WARN] Erreur de lecture fichier {path} : {error}")
+                continue
+            shas[path] = git_blob_sha(content.encode("utf-8"))
+            try:
+                entry = self._entry_from_markdown(path, content)
+                if entry:
+                    entries.append(entry)
+            except Exception as e:
+                print(f"[WARN] Erreur de lecture fichier {path} : {e}")
+        # Les fichiers arrivent dans le désordre : ordre stable par chemin
+        entries.sort(key=lambda entry: entry.get("file") or "")
+        return entries, shas
+
+    def get_sources(self):
+        """Correspondance chemin -> SHA de blob des fichiers indexés lors de la dernière reconstruction."""
+        try:
+            return json.loads(self.github.get_file(self.sources_path))
+        except Exception as e:
+            if isinstance(e, FileNotFoundError) or "404" in str(e):
+                return None
+            raise
+
+    @staticmethod
+    def _sources_content(shas: dict) -> str:
+        return json.dumps(dict(sorted(shas.items())), indent=0, ensure_ascii=False)
+
+    def _entry_from_markdown(self, path: str, content: str):
+        parts = content.split("---", 2)
+        if len(parts) < 3:
+            return None
+        metadata = yaml.safe_load(parts[1])
+        # S’assurer que la date est une chaîne bien formatée
+        date_str = metadata.get("date")
+        if isinstance(date_str, datetime):
+            date_str = date_str.strftime('%Y-%m-%d %H:%M:%S')
+
+        return {
+            "id": metadata.get("id"),
+            "type": metadata.get("type", "email"),
+            "title": metadata.get("title") or metadata.get("subject"),
+            "source": metadata.get("source"),
+            "date": date_str,
+            "author": metadata.get("author"),
+            "recipients": metadata.get("recipients", []),
+            "context": metadata.get("context", self.context),
+            "tags": metadata.get("tags", []),
+            "status": metadata.get("status", "en_cours"),
+            "file": path,
+            "summary": metadata.get("summary", ""),
+            "entry_id": metadata.get("entry_id"),
+            # Les anciens fichiers n’ont pas d’empreinte : elle est recalculée à partir du corps
+            "fingerprint": metadata.get("fingerprint") or body_fingerprint(parts[2].strip())
+        }
+
+    def migrate_to_partitioned_layout(self) -> dict:
+        """Déplace les emails à plat vers les partitions AAAA/MM en un seul commit."""
+        flat = [path for path in self.github.list_tree(self.emails_dir) if not is_partitioned(path)]
+        moves = {}
+        for path, content, error in self.github.get_files(flat):
+            if error:
+                print(f"[WARN] Migration impossible pour {path} : {error}")
+                continue
+            month = path_month(path)
+            if month is None:
+                entry = self._entry_from_markdown(path, content) or {}
+                try:
+                    day = datetime.strptime(str(entry.get("date")), '%Y-%m-%d %H:%M:%S')
+                except ValueError:
+                    print(f"[WARN] Date introuvable, fichier laissé en place : {path}")
+                    continue
+                month = (day.year, day.month)
+            new_path = f"{self.emails_dir}/{month[0]:04d}/{month[1]:02d}/{path.rsplit('/', 1)[-1]}"
+            moves[path] = (new_path, content)
+
+        if not moves:
+            print("[MIGRATION] Aucun fichier à déplacer.")
+            return {}
+
+        renamed = {old_path: new_path for old_path, (new_path, _) in moves.items()}
+        sources = self.get_sources()
+
+        def build(manifest, read_shards):
+            shards = read_shards(sorted(manifest["shards"]))
+            index = [entry for shard in shards.values() for entry in shard]
+            for entry in index:
+                if entry.get("file") in renamed:
+                    entry["file"] = renamed[entry["file"]]
+            files, deletions = self._index_files(index, manifest)
+            files.update({new_path: content for new_path, content in moves.values()})
+            if sources is not None:
+                files[self.sources_path] = self._sources_content(
+                    {renamed.get(path, path): sha for path, sha in sources.items()}
+                )
+            return files, deletions | set(moves)
+
+        self._commit_index(build, commit_message=f"Migration de {len(moves)} email(s) vers la structure AAAA/MM")
+        print(f"[MIGRATION] {len(moves)} email(s) déplacé(s).")
+        return renamed
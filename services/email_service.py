@@ -1,65 +1,205 @@
 import os
 import traceback
 import yaml
+from typing import TYPE_CHECKING
 from data.email_message import EmailMessage
-from clients.github_client import GitHubClient
-from clients.email_client import EmailClient
+from data.email_index import EmailIndex
+from clients.content_storage import ContentStorage
 from services.email_indexer import EmailIndexer
+from services.metadata_sync import MetadataSync
+from services.content_layout import email_path
 from clients.gpt_client import GPTClient
 
+if TYPE_CHECKING:
+    # Outlook (win32com) n’est requis que par le client réellement passé au service
+    from clients.email_client import EmailClient
+
 
 class EmailService:
-    def __init__(self, github: GitHubClient, email_client: EmailClient, context="MH"):
+    def __init__(self, github: ContentStorage, email_client: "EmailClient", context="MH", metadata: MetadataSync = None):
         self.github = github
         self.email_client = email_client
         self.context = context
         self.indexer = EmailIndexer(github=github, context=context)
         self.gpt = GPTClient()
+        # Copie SQLite locale de l’index : déduplication et écritures locales, poussées ensuite vers GitHub
+        self.metadata = metadata
+        # Appels GPT simultanés pour les résumés, et emails par commit lors d’une synchronisation
+        self.summary_workers = int(os.getenv("SUMMARY_WORKERS", "4"))
+        self.chunk_size = int(os.getenv("SYNC_CHUNK_SIZE", "50"))
 
     def get_index(self):
+        if self.metadata is not None:
+            return self.metadata.store.query(context=self.context)
         return self.indexer.get_index()
 
-    def sync_emails(self, limit=None):
-        try:
-            print("[INFO] Récupération de l'index existant...")
-            index = self.get_index()
-            existing_ids = set(item.get("id") for item in index)
-        except Exception as e:
-            print(f"[WARN] Index introuvable ou corrompu : {e}")
-            existing_ids = set()
+    def sync_emails(self, limit=None, incremental: bool = True):
+        """
+        Synchronise les emails reçus depuis le dernier watermark du compte (tous les `limit`
+        plus récents au premier passage ou avec incremental=False).
+        """
+        watermark = self.email_client.load_watermark() if incremental else None
+        emails = self.email_client.fetch_emails(limit=limit, since=watermark)
+        known, known_fingerprints = self._known(emails)
+        new_emails = []
+        for email in emails:
+            if email.id in known:
+                continue
+            if email.fingerprint and email.fingerprint in known_fingerprints:
+                # Même contenu déjà indexé (transfert, copie dans un autre dossier) : ni résumé ni fichier
+                print(f"[SKIP] Contenu déjà indexé : {email.subject}")
+                continue
+            if email.fingerprint:
+                known_fingerprints.add(email.fingerprint)
+            new_emails.append(email)
 
-        emails = self.email_client.fetch_emails(limit=limit)
-        new_emails = [email for email in emails if email.id not in existing_ids]
-
-        print(f"[INFO] Emails déjà indexés : {len(existing_ids)}")
+        print(f"[INFO] Emails déjà indexés : {len(emails) - len(new_emails)} sur {len(emails)}")
         print(f"[INFO] Nouveaux emails à traiter : {len(new_emails)}")
 
         paths = []
-        for email in new_emails:
+        if not new_emails:
+            self._advance_watermark(emails, failed=[])
+            return paths
+
+        # Pipeline par tranches : résumés en parallèle -> Markdown -> un commit -> une écriture d’index
+        failed = []
+        for start in range(0, len(new_emails), self.chunk_size):
+            chunk = new_emails[start:start + self.chunk_size]
+            paths.extend(self._sync_chunk(chunk, failed))
+        self._advance_watermark(emails, failed=failed)
+        return paths
+
+    def _sync_chunk(self, emails: list[EmailMessage], failed: list) -> list[str]:
+        """
+        Traite une tranche d’emails : les résumés sont demandés en parallèle, chaque email est
+        rendu et ajouté au lot dès que son résumé est prêt, puis la tranche est committée et
+        indexée en une fois. Un email en échec est isolé (ajouté à `failed`) sans bloquer les autres.
+        """
+        indexed = []
+        with self.github.batch(commit_message=f"Synchronisation de {len(emails)} email(s)"):
+            for email, summary in self._summarize_all(emails):
+                try:
+                    path = self._store_email(email, summary)
+                    indexed.append((email, path, summary))
+                except Exception:
+                    print(f"[ERREUR] Erreur lors du traitement de l’email : {email.subject}")
+                    traceback.print_exc()
+                    failed.append(email)
+        # Puis l’index, en une écriture conditionnelle fusionnée avec les écritures concurrentes.
+        # En cas d’échec, les emails de la tranche sont en échec : le watermark s’arrête avant eux
+        try:
+            self._index(indexed)
+        except Exception:
+            print(f"[ERREUR] Indexation impossible pour {len(indexed)} email(s), ils seront resynchronisés")
+            traceback.print_exc()
+            failed.extend(email for email, _, _ in indexed)
+            return []
+        return [path for _, path, _ in indexed]
+
+    def _summarize_all(self, emails: list[EmailMessage]):
+        """
+        Produit les couples (email, résumé) dans l’ordre des emails : au plus `summary_workers`
+        appels GPT simultanés, dans les limites RPM / TPM, et au plus deux fois plus de résumés
+        en attente d’être consommés (contre-pression). Un corps trop long pour un seul appel est
+        résumé par parties (map-reduce).
+        """
+        summary_requests = [self.gpt.summary_task(email.body) for email in emails]
+        for position, summary, error in self.gpt.complete_many(summary_requests, max_workers=self.summary_workers):
+            if error:
+                print(f"[WARN] Échec du résumé pour {emails[position].subject}, résumé vide.")
+                summary = ""
+            yield emails[position], summary
+
+    def _advance_watermark(self, emails: list[EmailMessage], failed: list[EmailMessage]):
+        """
+        Avance le watermark jusqu’au dernier email traité sans trou : un email en échec (et tous
+        les suivants) sera de nouveau proposé à la prochaine synchronisation.
+        """
+        failed_ids = {id(email) for email in failed}
+        last = None
+        for email in sorted(emails, key=lambda email: email.date.replace(tzinfo=None)):
+            if id(email) in failed_ids:
+                break
+            last = email
+        if last is not None:
+            self.email_client.save_watermark(last)
+
+    def _known(self, emails: list[EmailMessage]) -> tuple[set, set]:
+        """Identifiants des emails déjà indexés et empreintes de corps déjà indexées parmi ceux donnés."""
+        ids = [email.id for email in emails]
+        fingerprints = [email.fingerprint for email in emails]
+        if self.metadata is not None:
+            store = self.metadata.store
+            known, known_fingerprints, lookup = store.known_ids(ids), store.known_fingerprints(fingerprints), store.get
+        else:
             try:
-                path = self._push_email(email)
-                self.indexer.update_index_with_email(email, path)
-                paths.append(path)
+                print("[INFO] Récupération de l'index existant...")
+                index = self.indexer.load_index()
             except Exception as e:
-                print(f"[ERREUR] Erreur lors du traitement de l’email : {email.subject}")
-                traceback.print_exc()
-        return paths
+                print(f"[WARN] Index introuvable ou corrompu : {e}")
+                index = EmailIndex()
+            known = {entry_id for entry_id in ids if entry_id in index}
+            known_fingerprints = {fingerprint for fingerprint in fingerprints if index.get_by_fingerprint(fingerprint)}
+            lookup = index.get
+        # Emails indexés avant les identifiants stables, sous l’identifiant de leur minute de réception :
+        # reconnus seulement si l’entrée a aussi le même sujet et le même expéditeur
+        for email in emails:
+            if email.id in known:
+                continue
+            legacy = lookup(email.legacy_id)
+            if legacy and legacy.get("title") == email.subject and legacy.get("author") == email.sender:
+                known.add(email.id)
+        return known, known_fingerprints
+
+    def _index(self, indexed: list[tuple[EmailMessage, str, str]], status: str = None):
+        if not indexed:
+            return
+        if self.metadata is None:
+            self.indexer.update_index_with_emails(indexed)
+            if status:
+                self.indexer.set_status([email.id for email, _, _ in indexed], status)
+            return
+
+        entries = []
+        for email, path, summary in indexed:
+            entry = self.indexer.entry_from_email(email, path, summary)
+            if status:
+                entry["status"] = status
+            entries.append(entry)
+        # Transaction locale, puis écriture de l’index GitHub (en arrière-plan si démarrée)
+        self.metadata.store.upsert(entries, bodies={email.id: email.body for email, _, _ in indexed})
+        try:
+            self.metadata.request_push()
+        except Exception as e:
+            # Entrées enregistrées localement : elles restent à pousser au prochain passage
+            print(f"[WARN] Index GitHub non mis à jour, nouvelle tentative au prochain push : {e}")
+
+    def _push_email(self, email: EmailMessage) -> tuple[str, str]:
+        summary = self._summarize(email)
+        return self._store_email(email, summary), summary
 
-    def _push_email(self, email: EmailMessage) -> str:
+    def _summarize(self, email: EmailMessage) -> str:
         try:
-            summary = self.gpt.summarize_email(email.body)
+            return self.gpt.summarize_email(email.body)
         except Exception as e:
             print(f"[WARN] Échec du résumé pour {email.subject}, résumé vide.")
-            summary = ""
+            return ""
 
+    def _store_email(self, email: EmailMessage, summary: str) -> str:
         md_content = self._generate_markdown(email, summary)
-        filename = f"{self.context}/emails/{email.date.strftime('%Y-%m-%d')}_{email.id}.md"
+        filename = self.email_to_path(email)
         self.github.upload_file(filename, md_content, commit_message=f"Ajout email {email.subject}")
         return filename
 
+    def email_to_path(self, email: EmailMessage) -> str:
+        return email_path(self.context, email)
+
     def _generate_markdown(self, email: EmailMessage, summary: str) -> str:
         metadata = {
             "id": email.id,
+            "entry_id": email.entry_id,
+            "message_id": email.message_id,
+            "fingerprint": email.fingerprint,
             "subject": email.subject,
             "date": email.date.strftime('%Y-%m-%d %H:%M:%S'),
             "author": email.sender,
@@ -75,15 +215,18 @@ class EmailService:
 
     def archive_email_by_id(self, entry_id: str):
         archived = self.email_client.archive_email_by_id(entry_id)
-        path = self._push_email(archived)
-        self.indexer.update_index_with_email(archived, path)
+        path, summary = self._push_email(archived)
+        self._index([(archived, path, summary)], status="archive")
         return path
 
     def archive_emails_by_ids(self, ids: list[str]):
         archived_emails = self.email_client.archive_emails_by_ids(ids)
         paths = []
-        for email in archived_emails:
-            path = self._push_email(email)
-            self.indexer.update_index_with_email(email, path)
-            paths.append(path)
+        indexed = []
+        with self.github.batch(commit_message=f"Archivage de {len(archived_emails)} email(s)"):
+            for email in archived_emails:
+                path, summary = self._push_email(email)
+                indexed.append((email, path, summary))
+                paths.append(path)
+        self._index(indexed, status="archive")
         return paths
@@ -0,0 +1,85 @@
+import threading
+import traceback
+from data.email_index import entry_key
+from data.metadata_store import MetadataStore
+from services.email_indexer import EmailIndexer
+
+
+class MetadataSync:
+    """
+    Synchronise la copie SQLite locale avec l’index GitHub : `pull` aligne la copie sur l’index,
+    `push` écrit dans l’index les entrées modifiées localement (écriture conditionnelle fusionnée).
+    Une fois `start` appelé, les push ont lieu dans un thread d’arrière-plan ; sinon `request_push`
+    pousse immédiatement.
+    """
+
+    def __init__(self, store: MetadataStore, indexer: EmailIndexer, interval: float = 30.0):
+        self.store = store
+        self.indexer = indexer
+        self.interval = interval
+        self._push_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def pull(self, include_bodies: bool = False) -> int:
+        """
+        Recharge la copie locale depuis l’index ; include_bodies relit aussi le corps des emails.
+        Une erreur de lecture de l’index est levée et la copie locale reste inchangée : un index
+        illisible ne doit pas être pris pour un index vide.
+        """
+        entries = self.indexer.read_index()
+        bodies = {}
+        if include_bodies:
+            by_path = {entry.get("file"): entry_key(entry) for entry in entries}
+            for path, content, error in self.indexer.github.read_prefixes([self.indexer.emails_dir], suffix=".md"):
+                if error is None and path in by_path:
+                    bodies[by_path[path]] = content.split("---", 2)[-1].strip()
+        self.store.replace_remote(entries, bodies)
+        return len(entries)
+
+    def push(self) -> int:
+        """Écrit dans l’index GitHub les entrées en attente ; retourne le nombre d’entrées poussées."""
+        with self._push_lock:
+            pending = self.store.pending()
+            if not pending:
+                return 0
+            self.indexer.upsert_entries([entry for entry, _ in pending])
+            self.store.mark_pushed({entry_key(entry): version for entry, version in pending})
+            print(f"[METADATA] {len(pending)} entrée(s) poussée(s) vers l’index")
+            return len(pending)
+
+    def request_push(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._wake.set()
+        else:
+            self.push()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="metadata-push", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread d’arrière-plan après un dernier push."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.push()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                self.push()
+            except Exception:
+                # Les entrées restent en attente et seront retentées au prochain passage
+                print("[WARN] Échec du push des métadonnées vers l’index")
+                traceback.print_exc()
@@ -1,20 +1,21 @@
 from clients.gmail_client import GmailClient
 from clients.calendar_client import CalendarClient
-from clients.github_client import GitHubClient
+from clients.content_storage import ContentStorage, get_storage
+from services.email_indexer import EmailIndexer
 from bs4 import BeautifulSoup
 from io import BytesIO
 from docx import Document
 import re
 from yaml import safe_dump
 import base64
-import json
+from datetime import datetime
 
 
 class TranscriptionService:
-    def __init__(self):
+    def __init__(self, github: ContentStorage = None):
         self.gmail = GmailClient()
         self.calendar = CalendarClient()
-        self.github = GitHubClient()
+        self.github = github or get_storage()
 
     def run(self) -> list:
         agenda_map = self.calendar.get_events_map()
@@ -22,38 +23,44 @@ class TranscriptionService:
 
     def sync_transcriptions(self, limit=None):
         transcriptions = self.lire_emails_fathom(self.calendar.get_events_map(), limit=limit)
-        index = []
+        entries = []
         updates = {}
 
         for r in transcriptions:
             filename = f"MH/transcriptions/{r['date'].replace('/', '-')}_{r['titre'].replace(' ', '_')}.md"
             content = self._generate_markdown(r)
             updates[filename] = content
-
-            index.append({
-                "id": filename.split("/")[-1].replace(".md", ""),
-                "titre": r["titre"],
-                "date": r["date"],
-                "heure": r["heure"],
-                "fichier": filename,
-                "status": "en_cours",
-                "tags": ["transcription", "réunion"]
-            })
-
-        # Lire index.json existant et le mettre à jour
-        index_path = "MH/index.json"
+            entries.append(self._index_entry(filename, r))
+
+        if not updates:
+            return []
+        # Commit unique des transcriptions, puis ajout à l’index partagé avec les emails
+        # (écriture conditionnelle : pas de perte si une synchronisation d’emails écrit en même temps)
+        self.github.upload_files(updates, commit_message="Ajout de transcriptions Fathom")
+        EmailIndexer(github=self.github, context="MH").add_entries(
+            entries, commit_message="Ajout de transcriptions Fathom dans index"
+        )
+        return [entry["file"] for entry in entries]
+
+    def _index_entry(self, filename: str, r: dict) -> dict:
         try:
-            existing = self.github.read_json(index_path)
-            existing_ids = {item["id"] for item in existing}
-            updated = existing + [item for item in index if item["id"] not in existing_ids]
-        except Exception:
-            updated = index
-
-        updates[index_path] = self._generate_index_json(updated)
-
-        # Commit unique de tous les fichiers
-        self.github.upload_files(updates, commit_message="Ajout de transcriptions Fathom + mise à jour index")
-        return [i["fichier"] for i in index]
+            day = datetime.strptime(r["date"], "%d/%m/%Y").strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            day = None
+        return {
+            "id": filename.split("/")[-1].replace(".md", ""),
+            "type": "transcription",
+            "title": r["titre"],
+            "source": "Fathom",
+            "date": day,
+            "author": None,
+            "recipients": [],
+            "context": "MH",
+            "tags": ["transcription", "réunion"],
+            "status": "en_cours",
+            "file": filename,
+            "summary": r["conclusions"]
+        }
 
     def lire_emails_fathom(self, agenda_map, limit=10):
         emails = self.gmail.rechercher("from:no-reply@fathom.video", max_results=limit)
@@ -130,9 +137,6 @@ class TranscriptionService:
                f"## 🧭 Prochaines étapes\n{r.get('prochaines étapes', '(Non renseigné)')}"
         return f"---\n{frontmatter}---\n\n{body.strip()}"
 
-    def _generate_index_json(self, data: list) -> str:
-        return json.dumps(data, indent=2, ensure_ascii=False)
-
     def generer_docx_reunion(self, r):
         doc = Document()
         doc.add_heading(f"Réunion : {r['titre']} – {r['date']} ({r['heure']})", level=1)
@@ -0,0 +1,17 @@
+import os
+import sys
+import subprocess
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from clients.local_git_client import LocalGitClient
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Copie de travail git vide servie par LocalGitClient."""
+    repo = tmp_path / "repo"
+    subprocess.run(["git", "init", "-q", "-b", "main", str(repo)], check=True)
+    subprocess.run(["git", "-C", str(repo), "config", "user.email", "test@example.com"], check=True)
+    subprocess.run(["git", "-C", str(repo), "config", "user.name", "Test"], check=True)
+    return LocalGitClient(repo_path=str(repo), branch="main")
@@ -0,0 +1,68 @@
+import os
+import sys
+import subprocess
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.email_message import EmailMessage
+from services.content_layout import email_path, partition_prefixes, list_partitioned
+from services.email_indexer import EmailIndexer
+
+
+def markdown(email_id, day):
+    return f"---\nid: {email_id}\nsubject: Sujet {email_id}\ndate: '{day} 10:00:00'\n---\n\nCorps"
+
+
+def test_email_path_and_partition_prefixes():
+    email = EmailMessage("Sujet", "Corps", datetime(2025, 6, 3, 9, 30), "a@b.fr", [], id="abc")
+
+    assert email_path("MH", email) == "MH/emails/2025/06/2025-06-03_abc.md"
+    assert partition_prefixes("MH/emails", date(2024, 11, 15), date(2025, 2, 1)) == [
+        "MH/emails/2024/11", "MH/emails/2024/12", "MH/emails/2025/01", "MH/emails/2025/02"
+    ]
+
+
+def test_list_partitioned_reads_only_requested_months(storage):
+    storage.upload_file("MH/emails/2025/05/2025-05-02_a.md", markdown("a", "2025-05-02"), "a")
+    storage.upload_file("MH/emails/2025/06/2025-06-03_b.md", markdown("b", "2025-06-03"), "b")
+
+    assert list_partitioned(storage, "MH/emails", date(2025, 6, 1), date(2025, 6, 30)) == [
+        "MH/emails/2025/06/2025-06-03_b.md"
+    ]
+
+
+def test_list_partitioned_until_only_lists_once(storage, monkeypatch):
+    storage.upload_file("MH/emails/2025/05/2025-05-02_a.md", markdown("a", "2025-05-02"), "a")
+    storage.upload_file("MH/emails/2025/07/2025-07-03_b.md", markdown("b", "2025-07-03"), "b")
+    calls = []
+    list_tree = storage.list_tree
+    monkeypatch.setattr(storage, "list_tree", lambda path: calls.append(path) or list_tree(path))
+
+    assert list_partitioned(storage, "MH/emails", until=date(2025, 6, 30)) == [
+        "MH/emails/2025/05/2025-05-02_a.md"
+    ]
+    assert calls == ["MH/emails"]
+
+
+def test_migration_moves_flat_files_in_one_commit(storage, monkeypatch):
+    storage.upload_file("MH/emails/2025-05-02_a.md", markdown("a", "2025-05-02"), "a")
+    storage.upload_file("MH/emails/2025-06-03_b.md", markdown("b", "2025-06-03"), "b")
+    indexer = EmailIndexer(github=storage, context="MH")
+    indexer.run()
+
+    # Un seul commit_files : aucune écriture unitaire, qu’un lot pourrait committer en plusieurs fois
+    def unexpected_write(*args, **kwargs):
+        raise AssertionError("écriture unitaire pendant la migration")
+
+    monkeypatch.setattr(storage, "upload_file", unexpected_write)
+    monkeypatch.setattr(storage, "delete_file", unexpected_write)
+    moves = indexer.migrate_to_partitioned_layout()
+
+    assert moves["MH/emails/2025-05-02_a.md"] == "MH/emails/2025/05/2025-05-02_a.md"
+    assert storage.list_files("MH/emails") == [
+        "MH/emails/2025/05/2025-05-02_a.md", "MH/emails/2025/06/2025-06-03_b.md"
+    ]
+    index = indexer.get_index()
+    assert sorted(entry["file"] for entry in index) == sorted(moves.values())
+    log = subprocess.run(["git", "-C", storage.root, "log", "--oneline"], capture_output=True, text=True).stdout
+    assert len(log.splitlines()) == 4
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.disk_cache import DiskCache
+
+
+def test_set_get_and_lru_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=25)
+    cache.set("aa11", b"0123456789")
+    cache.set("bb22", b"0123456789")
+    # Accès à aa11 : bb22 devient la moins récemment utilisée
+    os.utime(cache._path("bb22"), (time.time() - 100, time.time() - 100))
+    assert cache.get("aa11") == b"0123456789"
+
+    cache.set("cc33", b"0123456789")
+
+    assert cache.get("bb22") is None
+    assert cache.get("aa11") == b"0123456789"
+    assert cache.get("cc33") == b"0123456789"
+    assert cache.size == 20
+    assert DiskCache(str(tmp_path), max_bytes=25).size == 20
+
+
+def test_ttl_expiration(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set("aa11", b"x")
+    old = time.time() - 120
+    os.utime(cache._path("aa11"), (old, old))
+
+    assert cache.get("aa11") is None
+    assert cache.size == 0
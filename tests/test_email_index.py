@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.email_index import EmailIndex
+
+
+def entry(entry_id, day, author="a@b.fr", status="en_cours"):
+    return {"id": entry_id, "date": f"{day} 10:00:00", "author": author, "status": status, "file": f"MH/emails/{entry_id}.md"}
+
+
+def test_membership_lookup_and_roundtrip():
+    entries = [entry("b", "2025-06-02"), entry("a", "2025-06-01"), {"id": None, "file": "MH/emails/sans-id.md"}]
+    index = EmailIndex.from_list(entries)
+
+    assert "a" in index and "z" not in index
+    assert index.get_by_path("MH/emails/b.md")["id"] == "b"
+    assert not index.add(entry("a", "2025-06-01"))
+    assert len(index) == 3
+    assert index.to_list() == entries
+
+
+def test_range_author_and_status_queries():
+    index = EmailIndex([
+        entry("a", "2025-05-31", author="x"),
+        entry("b", "2025-06-01", author="y"),
+        entry("c", "2025-06-15", author="x"),
+        entry("d", "2025-07-01", author="y"),
+    ])
+
+    assert [e["id"] for e in index.range("2025-06-01", "2025-06-30")] == ["b", "c"]
+    assert [e["id"] for e in index.range(since="2025-06-15", reverse=True)] == ["d", "c"]
+    assert [e["id"] for e in index.by_author("x")] == ["a", "c"]
+
+    assert index.set_status("c", "archive")
+    assert [e["id"] for e in index.by_status("archive")] == ["c"]
+    assert [e["id"] for e in index.by_status("en_cours")] == ["a", "b", "d"]
+
+    index.remove_path("MH/emails/b.md")
+    assert "b" not in index
+    assert [e["id"] for e in index.range("2025-06-01", "2025-06-30")] == ["c"]
+
+
+def test_fingerprint_lookup_returns_first_indexed_entry():
+    index = EmailIndex([
+        {"id": "a", "date": "2025-06-01 10:00:00", "fingerprint": "f1"},
+        {"id": "b", "date": "2025-06-02 10:00:00", "fingerprint": "f1"},
+    ])
+
+    assert index.get_by_fingerprint("f1")["id"] == "a"
+    assert index.get_by_fingerprint(None) is None
+    index.remove("a")
+    assert index.get_by_fingerprint("f1") is None
@@ -1,5 +1,4 @@
 import pytest
-import json
 from services.email_service import EmailService
 from clients.github_client import GitHubClient
 from clients.email_client import EmailClient
@@ -23,12 +22,10 @@ def test_indexer_integration(setup_service):
     ids = [email.id for email in emails]
 
     # Étape 2 : vérification directe de l’index (déjà mis à jour)
-    index_path = "MH/index.json"
     try:
-        content = service.github.get_file(index_path)
-        metadata_list = json.loads(content)
+        metadata_list = service.indexer.get_index()
     except Exception as e:
-        pytest.fail(f"Erreur de lecture index.json : {e}")
+        pytest.fail(f"Erreur de lecture de l’index : {e}")
 
     indexed_ids = [meta["id"] for meta in metadata_list]
     for eid in ids:
@@ -41,7 +38,5 @@ def test_indexer_integration(setup_service):
         except Exception as e:
             pytest.fail(f"Erreur suppression {path} : {e}")
 
-    try:
-        service.github.delete_file(index_path, commit_message="Suppression index.json post-test")
-    except Exception as e:
-        pytest.fail(f"Erreur suppression index.json : {e}")
+    # Reconstruction de l’index sans les fichiers supprimés
+    service.indexer.run()
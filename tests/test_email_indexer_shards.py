@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import subprocess
+from datetime import date, datetime
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.email_message import EmailMessage
+from services.email_indexer import EmailIndexer
+
+
+def make_email(email_id, day):
+    return EmailMessage(f"Sujet {email_id}", f"Corps {email_id}", day, "a@b.fr", ["c@d.fr"], id=email_id)
+
+
+def test_legacy_index_is_split_into_monthly_shards(storage):
+    legacy = [
+        {"id": "a", "date": "2025-05-02 10:00:00", "file": "MH/emails/a.md"},
+        {"id": "b", "date": "2025-06-03 10:00:00", "file": "MH/emails/b.md"},
+    ]
+    storage.upload_file("MH/index.json", json.dumps(legacy), commit_message="Ancien index")
+    indexer = EmailIndexer(github=storage, context="MH")
+    assert [entry["id"] for entry in indexer.get_index()] == ["a", "b"]
+
+    indexer.update_index_with_email(make_email("c", datetime(2025, 6, 20, 9, 0)), "MH/emails/c.md")
+
+    assert storage.list_files("MH/index") == [
+        "MH/index/2025-05.jsonl", "MH/index/2025-06.jsonl", "MH/index/manifest.json"
+    ]
+    with pytest.raises(FileNotFoundError):
+        storage.get_file("MH/index.json")
+    assert [entry["id"] for entry in indexer.get_index()] == ["a", "b", "c"]
+    assert [entry["id"] for entry in indexer.get_index(since=date(2025, 6, 1))] == ["b", "c"]
+
+
+def test_new_entry_touches_only_its_shard(storage):
+    indexer = EmailIndexer(github=storage, context="MH")
+    indexer.update_index_with_email(make_email("a", datetime(2025, 5, 2, 9, 0)), "MH/emails/a.md")
+    may = storage.get_file("MH/index/2025-05.jsonl")
+
+    indexer.update_index_with_email(make_email("b", datetime(2025, 6, 3, 9, 0)), "MH/emails/b.md")
+    indexer.update_index_with_email(make_email("b", datetime(2025, 6, 3, 9, 0)), "MH/emails/b.md")
+
+    changed = subprocess.run(
+        ["git", "-C", storage.root, "diff", "--name-only", "HEAD~1", "HEAD"], capture_output=True, text=True
+    ).stdout.split()
+    assert changed == ["MH/index/2025-06.jsonl", "MH/index/manifest.json"]
+    assert storage.get_file("MH/index/2025-05.jsonl") == may
+    manifest = indexer.get_manifest()
+    assert manifest["shards"]["2025-06"]["count"] == 1
+
+
+def test_batch_update_writes_once_without_reading_back(storage):
+    indexer = EmailIndexer(github=storage, context="MH")
+    items = [
+        (make_email(f"m{i}", datetime(2025, 5 + i % 2, 1 + i, 9, 0)), f"MH/emails/m{i}.md", f"Résumé {i}")
+        for i in range(6)
+    ]
+
+    assert indexer.update_index_with_emails(items) == 6
+    assert indexer.update_index_with_emails(items[:2]) == 0
+
+    log = subprocess.run(["git", "-C", storage.root, "log", "--oneline"], capture_output=True, text=True).stdout
+    # Un seul commit pour les six emails (index et manifeste créés dans le même commit)
+    assert len(log.splitlines()) == 1
+    index = indexer.get_index()
+    assert sorted(entry["summary"] for entry in index) == [f"Résumé {i}" for i in range(6)]
+
+
+def test_incremental_rebuild_reparses_only_changes(storage, monkeypatch):
+    def markdown(email_id, summary):
+        return f"---\nid: {email_id}\nsubject: Sujet\ndate: '2025-06-01 10:00:00'\nsummary: {summary}\n---\n\nCorps"
+
+    for name in ("a", "b", "c"):
+        storage.upload_file(f"MH/emails/2025/06/{name}.md", markdown(name, "v1"), commit_message=name)
+    indexer = EmailIndexer(github=storage, context="MH")
+    indexer.run()
+
+    storage.upload_file("MH/emails/2025/06/b.md", markdown("b", "v2"), commit_message="b modifié")
+    storage.delete_file("MH/emails/2025/06/c.md", commit_message="c supprimé")
+    storage.upload_file("MH/emails/2025/06/d.md", markdown("d", "v1"), commit_message="d ajouté")
+
+    read = []
+    original_get_files = storage.get_files
+
+    def tracking_get_files(paths):
+        read.extend(path for path in paths if path.startswith("MH/emails/"))
+        return original_get_files(paths)
+
+    monkeypatch.setattr(storage, "get_files", tracking_get_files)
+    indexer.run()
+
+    assert sorted(read) == ["MH/emails/2025/06/b.md", "MH/emails/2025/06/d.md"]
+    summaries = {entry["id"]: entry["summary"] for entry in indexer.get_index()}
+    assert summaries == {"a": "v1", "b": "v2", "d": "v1"}
+
+    read.clear()
+    indexer.run()
+    assert read == []
+
+    indexer.run(full=True)
+    assert len(read) == 3
+
+
+def test_set_status_rewrites_only_affected_shard(storage):
+    indexer = EmailIndexer(github=storage, context="MH")
+    indexer.update_index_with_emails([
+        (make_email("a", datetime(2025, 5, 2, 9, 0)), "MH/emails/a.md", ""),
+        (make_email("b", datetime(2025, 6, 3, 9, 0)), "MH/emails/b.md", ""),
+    ])
+
+    assert indexer.set_status(["b"], "archive") == 1
+
+    changed = subprocess.run(
+        ["git", "-C", storage.root, "diff", "--name-only", "HEAD~1", "HEAD"], capture_output=True, text=True
+    ).stdout.split()
+    assert changed == ["MH/index/2025-06.jsonl"]
+    assert [e["id"] for e in indexer.load_index().by_status("archive")] == ["b"]
+
+
+def test_concurrent_index_writes_are_merged(storage, monkeypatch):
+    indexer = EmailIndexer(github=storage, context="MH")
+    other = EmailIndexer(github=storage, context="MH")
+    indexer.update_index_with_emails([(make_email("a", datetime(2025, 6, 1, 9, 0)), "MH/emails/a.md", "")])
+
+    real_commit = storage.commit_files
+    calls = []
+
+    def racing_commit(*args, **kwargs):
+        # Un autre processus écrit l’index entre la lecture et le commit de la première tentative
+        calls.append(kwargs["expected_shas"])
+        if len(calls) == 1:
+            monkeypatch.setattr(storage, "commit_files", real_commit)
+            other.update_index_with_emails([(make_email("b", datetime(2025, 6, 2, 9, 0)), "MH/emails/b.md", "")])
+            monkeypatch.setattr(storage, "commit_files", racing_commit)
+        return real_commit(*args, **kwargs)
+
+    monkeypatch.setattr(storage, "commit_files", racing_commit)
+    monkeypatch.setattr("services.email_indexer.WRITE_RETRY_DELAY", 0)
+    indexer.update_index_with_emails([(make_email("c", datetime(2025, 6, 3, 9, 0)), "MH/emails/c.md", "")])
+    indexer.set_status(["a"], "archive")
+
+    assert len(calls) == 3
+    index = indexer.load_index()
+    assert sorted(index.ids()) == ["a", "b", "c"]
+    assert index.get("a")["status"] == "archive"
+
+
+def test_identical_bodies_are_indexed_once(storage):
+    indexer = EmailIndexer(github=storage, context="MH")
+    body = "Bonjour, vous trouverez ci-joint le compte rendu de la réunion budgétaire de mardi dernier."
+    original = EmailMessage("Sujet", body, datetime(2025, 6, 1, 9, 0), "a@b.fr", [], id="a")
+    forwarded = EmailMessage("Tr: sujet", body.upper() + "\n", datetime(2025, 6, 2, 9, 0), "x@y.fr", [], id="b")
+
+    assert indexer.update_index_with_emails([(original, "MH/emails/a.md", ""), (forwarded, "MH/emails/b.md", "")]) == 1
+    assert list(indexer.load_index().ids()) == ["a"]
+
+
+def test_empty_and_short_bodies_are_not_deduplicated(storage):
+    indexer = EmailIndexer(github=storage, context="MH")
+    emails = [
+        EmailMessage("Invitation", "", datetime(2025, 6, 1, 9, 0), "a@b.fr", []),
+        EmailMessage("Pièce jointe", "", datetime(2025, 6, 1, 10, 0), "a@b.fr", []),
+        EmailMessage("Re: devis", "Merci", datetime(2025, 6, 2, 9, 0), "a@b.fr", []),
+        EmailMessage("Re: planning", "merci", datetime(2025, 6, 2, 9, 5), "x@y.fr", []),
+    ]
+
+    items = [(email, f"MH/emails/{email.id}.md", "") for email in emails]
+    assert len({email.id for email in emails}) == 4
+    assert indexer.update_index_with_emails(items) == 4
+
+
+def test_rebuild_aborts_when_a_shard_cannot_be_read(storage, monkeypatch):
+    def markdown(email_id, day):
+        return f"---\nid: {email_id}\nsubject: Sujet\ndate: '{day} 10:00:00'\n---\n\nCorps {email_id}"
+
+    storage.upload_file("MH/emails/2025/05/a.md", markdown("a", "2025-05-02"), commit_message="a")
+    storage.upload_file("MH/emails/2025/06/b.md", markdown("b", "2025-06-03"), commit_message="b")
+    indexer = EmailIndexer(github=storage, context="MH")
+    indexer.run()
+    storage.upload_file("MH/emails/2025/06/c.md", markdown("c", "2025-06-04"), commit_message="c")
+
+    original_get_files = storage.get_files
+
+    def failing_get_files(paths):
+        for path, content, error in original_get_files(paths):
+            if path == "MH/index/2025-05.jsonl":
+                content, error = None, RuntimeError("503")
+            yield path, content, error
+
+    monkeypatch.setattr(storage, "get_files", failing_get_files)
+    for run in (indexer.run, lambda: indexer.run(since=date(2025, 6, 1))):
+        run()
+        with pytest.raises(RuntimeError):
+            indexer.read_index()
+    assert indexer.get_index() == []
+
+    monkeypatch.setattr(storage, "get_files", original_get_files)
+    assert sorted(entry["id"] for entry in indexer.get_index()) == ["a", "b"]
+    indexer.run()
+    assert sorted(entry["id"] for entry in indexer.get_index()) == ["a", "b", "c"]
+
+
+def test_rebuild_keeps_transcriptions_and_concurrent_entries(storage, monkeypatch):
+    def markdown(email_id):
+        return f"---\nid: {email_id}\nsubject: Sujet\ndate: '2025-06-01 10:00:00'\n---\n\nCorps {email_id}"
+
+    storage.upload_file("MH/emails/2025/06/a.md", markdown("a"), commit_message="a")
+    indexer = EmailIndexer(github=storage, context="MH")
+    other = EmailIndexer(github=storage, context="MH")
+    indexer.run()
+    other.add_entries([{"id": "t", "type": "transcription", "date": "2025-06-02 10:00:00", "file": "MH/transcriptions/t.md"}])
+    storage.upload_file("MH/emails/2025/06/b.md", markdown("b"), commit_message="b")
+
+    real_commit = storage.commit_files
+
+    def racing_commit(*args, **kwargs):
+        # Un email est synchronisé (fichier puis index) pendant la reconstruction
+        monkeypatch.setattr(storage, "commit_files", real_commit)
+        storage.upload_file("MH/emails/2025/06/c.md", markdown("c"), commit_message="c")
+        other.add_entries([{"id": "c", "date": "2025-06-03 10:00:00", "file": "MH/emails/2025/06/c.md"}])
+        return real_commit(*args, **kwargs)
+
+    monkeypatch.setattr(storage, "commit_files", racing_commit)
+    monkeypatch.setattr("services.email_indexer.WRITE_RETRY_DELAY", 0)
+    indexer.run()
+    assert sorted(entry["id"] for entry in indexer.read_index()) == ["a", "b", "c", "t"]
+
+    storage.delete_file("MH/emails/2025/06/a.md", commit_message="a supprimé")
+    indexer.run(full=True)
+    assert sorted(entry["id"] for entry in indexer.read_index()) == ["b", "c", "t"]
@@ -0,0 +1,39 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.email_message import EmailMessage, body_fingerprint
+
+
+def make_email(body="Bonjour", **kwargs):
+    return EmailMessage("Sujet", body, datetime(2025, 6, 3, 9, 30), "a@b.fr", [], **kwargs)
+
+
+def test_ids_are_stable_and_do_not_collide_within_a_minute():
+    first = make_email(message_id="<1@example.com>", entry_id="E1")
+    moved = make_email(message_id="<1@example.com>", entry_id="E2")
+    second = make_email(message_id="<2@example.com>", entry_id="E3")
+
+    # Le Message-ID prime sur l’EntryID, qui change quand l’email change de dossier
+    assert first.id == moved.id
+    assert first.id != second.id
+    assert make_email(entry_id="E1").id != make_email(entry_id="E3").id
+
+
+LONG_BODY = "Bonjour à tous,\n\n  voici le planning de la semaine prochaine et les points à préparer pour lundi."
+
+
+def test_fingerprint_fallback_ignores_whitespace_and_case():
+    assert body_fingerprint(LONG_BODY) == body_fingerprint(" ".join(LONG_BODY.upper().split()))
+    assert make_email(LONG_BODY).id == make_email(LONG_BODY.replace(" ", "  ")).id
+    assert make_email("Bonjour").id != make_email("Au revoir").id
+
+
+def test_short_bodies_have_no_fingerprint_and_distinct_ids():
+    assert body_fingerprint("") is None and body_fingerprint("Merci") is None
+    merci = make_email("Merci")
+    other = EmailMessage("Sujet", "merci", datetime(2025, 6, 3, 9, 30), "x@y.fr", [])
+    assert merci.fingerprint is None
+    assert merci.id != other.id
+    assert merci.legacy_id == "2025-06-03_09-30_mail"
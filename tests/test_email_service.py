@@ -1,7 +1,6 @@
 import os
 import sys
 import pytest
-import json
 from dotenv import load_dotenv
 
 # Ajouter le chemin vers les modules
@@ -39,13 +38,12 @@ def test_sync_and_indexation_cleanup(setup_service):
             pass
 
     # Sync : essaie de push jusqu'à 2
-    paths_md = service.sync_emails(limit=2)
+    paths_md = service.sync_emails(limit=2, incremental=False)
     assert len(paths_md) + len(initial_paths) == 2 or len(initial_paths) == 2
 
     # Vérifie que les emails sont bien indexés dans index.json
     try:
-        index_raw = service.github.get_file(f"{service.context}/index.json")
-        index = json.loads(index_raw)
+        index = service.get_index()
         indexed_ids = [entry["id"] for entry in index]
         for email in emails:
             assert email.id in indexed_ids
@@ -59,7 +57,5 @@ def test_sync_and_indexation_cleanup(setup_service):
         except Exception as e:
             pytest.fail(f"Erreur suppression {path} : {e}")
 
-    try:
-        service.github.delete_file(f"{service.context}/index.json", commit_message="Nettoyage index.json")
-    except Exception as e:
-        pytest.fail(f"Erreur suppression index.json : {e}")
+    # Reconstruction de l’index sans les fichiers supprimés
+    service.indexer.run()
@@ -0,0 +1,128 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.email_message import EmailMessage
+from services.email_service import EmailService
+
+
+class FakeEmailClient:
+    """Boîte Outlook simulée : emails fournis par le test, watermark en mémoire."""
+
+    def __init__(self, emails):
+        self.emails = emails
+        self.watermark = None
+        self.fetched_since = []
+
+    def fetch_emails(self, limit=None, since=None):
+        self.fetched_since.append(since)
+        return list(self.emails)
+
+    def load_watermark(self):
+        return self.watermark
+
+    def save_watermark(self, email):
+        self.watermark = email
+
+
+class FakeGPT:
+    """Résumés simulés, dans l’ordre des requêtes ; un corps contenant « ÉCHEC » fait échouer l’appel."""
+
+    def summary_task(self, body):
+        return {"prompt": body}
+
+    def complete_many(self, items, max_workers=4, ordered=True):
+        for position, request in enumerate(items):
+            if "ÉCHEC" in request["prompt"]:
+                yield position, None, RuntimeError("Erreur HTTP GPT : 500")
+            else:
+                yield position, f"Résumé : {request['prompt']}", None
+
+
+def make_service(storage, emails, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "fake_api_key")
+    service = EmailService(github=storage, email_client=FakeEmailClient(emails), context="MH")
+    service.gpt = FakeGPT()
+    service.chunk_size = 2
+    return service
+
+
+def make_emails(count):
+    return [
+        EmailMessage(f"Sujet {i}", f"Corps {i}", datetime(2025, 6, 1, 9, i), "a@b.fr", [], entry_id=f"E{i}")
+        for i in range(count)
+    ]
+
+
+def test_sync_indexes_in_order_and_isolates_summary_failures(storage, monkeypatch):
+    emails = make_emails(3)
+    emails[1].body = "Corps ÉCHEC"
+    service = make_service(storage, emails, monkeypatch)
+
+    paths = service.sync_emails()
+
+    assert paths == [service.email_to_path(email) for email in emails]
+    summaries = {entry["id"]: entry["summary"] for entry in service.indexer.read_index()}
+    assert summaries == {emails[0].id: "Résumé : Corps 0", emails[1].id: "", emails[2].id: "Résumé : Corps 2"}
+    assert service.email_client.watermark is emails[2]
+
+    # Seconde synchronisation : tout est déjà indexé
+    assert service.sync_emails() == []
+
+
+def test_watermark_stops_before_first_failed_email(storage, monkeypatch):
+    emails = make_emails(4)
+    service = make_service(storage, emails, monkeypatch)
+    store_email = service._store_email
+
+    def failing_store(email, summary):
+        if email is emails[2]:
+            raise RuntimeError("Écriture impossible")
+        return store_email(email, summary)
+
+    monkeypatch.setattr(service, "_store_email", failing_store)
+    paths = service.sync_emails()
+
+    assert paths == [service.email_to_path(email) for email in (emails[0], emails[1], emails[3])]
+    assert service.email_client.watermark is emails[1]
+
+
+def test_watermark_follows_reception_order(storage, monkeypatch):
+    emails = make_emails(3)
+    service = make_service(storage, list(reversed(emails)), monkeypatch)
+
+    service.sync_emails()
+
+    assert service.email_client.fetched_since == [None]
+    assert service.email_client.watermark is emails[2]
+
+
+def test_index_failure_keeps_emails_for_next_sync(storage, monkeypatch):
+    emails = make_emails(2)
+    service = make_service(storage, emails, monkeypatch)
+    add_entries = service.indexer.add_entries
+
+    def failing_add_entries(entries, commit_message=None):
+        raise RuntimeError("503 Service Unavailable")
+
+    monkeypatch.setattr(service.indexer, "add_entries", failing_add_entries)
+    assert service.sync_emails() == []
+    assert service.email_client.watermark is None
+
+    monkeypatch.setattr(service.indexer, "add_entries", add_entries)
+    assert len(service.sync_emails()) == 2
+    assert service.email_client.watermark is emails[1]
+
+
+def test_legacy_entry_only_matches_same_subject_and_sender(storage, monkeypatch):
+    indexed = EmailMessage("Sujet 0", "Corps 0", datetime(2025, 6, 1, 9, 0, 5), "a@b.fr", [], entry_id="E0")
+    same_minute = EmailMessage("Autre sujet", "Corps 1", datetime(2025, 6, 1, 9, 0, 40), "c@d.fr", [], entry_id="E1")
+    service = make_service(storage, [indexed, same_minute], monkeypatch)
+    service.indexer.add_entries([{
+        "id": indexed.legacy_id, "type": "email", "title": "Sujet 0", "author": "a@b.fr",
+        "date": "2025-06-01 09:00:05", "file": "MH/emails/2025-06-01_09-00_mail.md",
+    }])
+
+    # L’ancienne entrée de la minute ne masque que l’email qu’elle décrit
+    assert service.sync_emails() == [service.email_to_path(same_minute)]
@@ -0,0 +1,322 @@
+import io
+import os
+import sys
+import tarfile
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from clients.github_client import GitHubClient
+from clients.content_storage import ConflictError, git_blob_sha
+
+REPO_URL = "https://api.github.com/repos/owner/content"
+
+
+@pytest.fixture
+def github(monkeypatch, tmp_path):
+    monkeypatch.setenv("GITHUB_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("GITHUB_TOKEN", "fake_token")
+    monkeypatch.setenv("GITHUB_OWNER", "owner")
+    monkeypatch.setenv("GITHUB_REPO", "content")
+    monkeypatch.setenv("GITHUB_BRANCH", "main")
+    client = GitHubClient()
+    client.http.sleep = lambda seconds: None
+    return client
+
+
+def mock_git_data_api(requests_mock):
+    requests_mock.get(f"{REPO_URL}/git/refs/heads/main", json={"object": {"sha": "head"}})
+    requests_mock.get(f"{REPO_URL}/git/commits/head", json={"tree": {"sha": "base-tree"}})
+    requests_mock.post(f"{REPO_URL}/git/trees", json={"sha": "new-tree"})
+    requests_mock.post(f"{REPO_URL}/git/commits", json={"sha": "new-commit"})
+    requests_mock.patch(f"{REPO_URL}/git/refs/heads/main", json={"object": {"sha": "new-commit"}})
+
+
+def test_upload_files_single_commit(github, requests_mock):
+    mock_git_data_api(requests_mock)
+
+    files = {f"MH/emails/mail_{i}.md": f"contenu {i}" for i in range(30)}
+    commit = github.upload_files(files, commit_message="Lot de test")
+
+    assert commit["sha"] == "new-commit"
+    # Nombre d'appels constant : ref, commit parent, arbre, commit, mise à jour de la ref
+    assert requests_mock.call_count == 5
+
+    tree_request = requests_mock.request_history[2].json()
+    assert tree_request["base_tree"] == "base-tree"
+    assert len(tree_request["tree"]) == 30
+    assert requests_mock.request_history[4].json() == {"sha": "new-commit"}
+
+
+def test_conditional_commit_detects_concurrent_writes(github, requests_mock):
+    mock_git_data_api(requests_mock)
+    requests_mock.get(
+        f"{REPO_URL}/git/trees/head:MH/index",
+        json={"tree": [{"path": "2025-06.jsonl", "type": "blob", "sha": "remote-sha"}]}
+    )
+
+    # SHA différent de celui lu : rien n'est écrit
+    with pytest.raises(ConflictError):
+        github.commit_files({"MH/index/2025-06.jsonl": "{}\n"}, "Index", expected_shas={"MH/index/2025-06.jsonl": "read-sha"})
+    assert not any(request.method == "POST" for request in requests_mock.request_history)
+
+    # SHA à jour, mais la branche avance avant la mise à jour de la ref (fast-forward refusé)
+    requests_mock.patch(f"{REPO_URL}/git/refs/heads/main", status_code=422, json={"message": "Update is not a fast forward"})
+    with pytest.raises(ConflictError):
+        github.commit_files({"MH/index/2025-06.jsonl": "{}\n"}, "Index", expected_shas={"MH/index/2025-06.jsonl": "remote-sha"})
+
+
+def test_batch_buffers_writes_and_reads_own_writes(github, requests_mock):
+    mock_git_data_api(requests_mock)
+
+    with github.batch(commit_message="Synchronisation"):
+        github.upload_file("MH/index.json", "[]", commit_message="ignoré")
+        github.upload_file("MH/index.json", "[{}]", commit_message="ignoré")
+        github.delete_file("MH/old.md", commit_message="ignoré")
+        assert github.get_file("MH/index.json") == "[{}]"
+        with pytest.raises(FileNotFoundError):
+            github.get_file("MH/old.md")
+        assert requests_mock.call_count == 0
+
+    tree = requests_mock.request_history[2].json()["tree"]
+    assert {"path": "MH/index.json", "mode": "100644", "type": "blob", "content": "[{}]"} in tree
+    assert {"path": "MH/old.md", "mode": "100644", "type": "blob", "sha": None} in tree
+    assert requests_mock.request_history[3].json()["message"] == "Synchronisation"
+    assert github._staging_area == {}
+
+
+def test_batch_flushes_when_size_exceeded(github, requests_mock):
+    mock_git_data_api(requests_mock)
+    github.max_staged_bytes = 10
+
+    with github.batch(commit_message="Gros lot"):
+        github.upload_file("MH/a.md", "0123456789", commit_message="ignoré")
+        assert requests_mock.call_count == 5
+        github.upload_file("MH/b.md", "x", commit_message="ignoré")
+
+    assert requests_mock.call_count == 10
+
+
+def test_list_tree_single_call_with_prefix(github, requests_mock):
+    requests_mock.get(f"{REPO_URL}/git/trees/main:MH/emails", json={
+        "sha": "emails-tree",
+        "truncated": False,
+        "tree": [
+            {"path": "2025", "type": "tree", "sha": "t1"},
+            {"path": "2025/a.md", "type": "blob", "sha": "s1", "size": 10},
+            {"path": "b.md", "type": "blob", "sha": "s2", "size": 20},
+        ]
+    })
+
+    assert github.get_file_shas("MH/emails/") == {"MH/emails/2025/a.md": "s1", "MH/emails/b.md": "s2"}
+    assert github.list_files("MH/emails") == ["MH/emails/2025/a.md", "MH/emails/b.md"]
+    assert requests_mock.request_history[0].qs == {"recursive": ["1"]}
+
+
+def test_list_tree_handles_truncated_tree(github, requests_mock):
+    requests_mock.get(f"{REPO_URL}/git/trees/main:MH", json={"sha": "mh", "truncated": True, "tree": []})
+    requests_mock.get(f"{REPO_URL}/git/trees/mh", json={
+        "sha": "mh",
+        "tree": [
+            {"path": "index.json", "type": "blob", "sha": "idx", "size": 2},
+            {"path": "emails", "type": "tree", "sha": "emails"},
+        ]
+    })
+    requests_mock.get(f"{REPO_URL}/git/trees/emails", json={
+        "sha": "emails",
+        "truncated": False,
+        "tree": [{"path": "a.md", "type": "blob", "sha": "s1", "size": 10}]
+    })
+
+    assert github.list_tree("MH") == {
+        "MH/emails/a.md": {"sha": "s1", "size": 10},
+        "MH/index.json": {"sha": "idx", "size": 2},
+    }
+
+
+def test_get_file_uses_blob_cache_and_etag(github, requests_mock):
+    url = f"{REPO_URL}/contents/MH/index.json"
+    requests_mock.get(url, [
+        {"status_code": 200, "text": "[]", "headers": {"ETag": 'W/"etag-1"'}},
+        {"status_code": 304},
+    ])
+
+    assert github.get_file("MH/index.json") == "[]"
+    assert requests_mock.last_request.headers["Accept"] == "application/vnd.github.raw+json"
+
+    # Nouveau client (ex. rerun Streamlit) : requête conditionnelle, réponse 304 servie depuis le cache
+    other = GitHubClient()
+    assert other.get_file("MH/index.json") == "[]"
+    assert requests_mock.last_request.headers["If-None-Match"] == 'W/"etag-1"'
+    assert other.metrics["not_modified"] == 1
+
+    # SHA connu par le listing : aucun appel réseau
+    requests_mock.get(f"{REPO_URL}/git/trees/main:MH", json={
+        "sha": "mh", "tree": [{"path": "index.json", "type": "blob", "sha": git_blob_sha(b"[]"), "size": 2}]
+    })
+    other.list_tree("MH")
+    calls = requests_mock.call_count
+    assert other.get_file("MH/index.json") == "[]"
+    assert requests_mock.call_count == calls
+    assert other.metrics["cache_hits"] == 1
+
+
+def test_get_files_concurrent_with_per_path_errors(github, requests_mock):
+    for i in range(10):
+        requests_mock.get(f"{REPO_URL}/contents/MH/emails/{i}.md", text=f"mail {i}")
+    requests_mock.get(f"{REPO_URL}/contents/MH/emails/absent.md", status_code=404)
+
+    paths = [f"MH/emails/{i}.md" for i in range(10)] + ["MH/emails/absent.md"]
+    results = {path: (content, error) for path, content, error in github.get_files(paths, max_workers=4)}
+
+    assert len(results) == 11
+    assert results["MH/emails/3.md"] == ("mail 3", None)
+    assert results["MH/emails/absent.md"][0] is None
+    assert "404" in str(results["MH/emails/absent.md"][1])
+
+
+def test_get_files_graphql_batches(github, requests_mock):
+    def graphql_callback(request, context):
+        variables = request.json()["variables"]
+        repository = {}
+        for key, expression in variables.items():
+            if not key.startswith("e"):
+                continue
+            path = expression.split(":", 1)[1]
+            if path.endswith("absent.md"):
+                repository[f"f{key[1:]}"] = None
+            else:
+                repository[f"f{key[1:]}"] = {
+                    "oid": f"oid-{path}", "text": f"texte {path}", "isBinary": False, "isTruncated": False
+                }
+        return {"data": {"repository": repository}}
+
+    requests_mock.post("https://api.github.com/graphql", json=graphql_callback)
+
+    paths = [f"MH/emails/{i}.md" for i in range(149)] + ["MH/emails/absent.md"]
+    results = {path: (content, error) for path, content, error in github.get_files(paths)}
+
+    assert requests_mock.call_count == 2
+    assert results["MH/emails/42.md"] == ("texte MH/emails/42.md", None)
+    assert isinstance(results["MH/emails/absent.md"][1], FileNotFoundError)
+    assert requests_mock.request_history[0].json()["variables"]["e0"] == "main:MH/emails/0.md"
+
+    # Seconde lecture : blobs connus et en cache, aucun appel réseau
+    assert github.get_file("MH/emails/7.md") == "texte MH/emails/7.md"
+    assert requests_mock.call_count == 2
+
+
+def test_read_prefixes_uses_archive_on_cold_start(github, requests_mock):
+    files = {f"MH/emails/{i}.md": f"mail {i}" for i in range(3)}
+    files["MH/backlog.json"] = "[]"
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, content in files.items():
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(f"owner-content-abc123/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    requests_mock.get(f"{REPO_URL}/git/trees/main:MH/emails", json={"sha": "t", "tree": [
+        {"path": f"{i}.md", "type": "blob", "sha": git_blob_sha(f"mail {i}".encode("utf-8")), "size": 6}
+        for i in range(3)
+    ]})
+    requests_mock.get(f"{REPO_URL}/tarball/main", content=buffer.getvalue())
+    github.snapshot_threshold = 2
+
+    results = sorted((path, content) for path, content, error in github.read_prefixes(["MH/emails"]))
+
+    assert results == [(f"MH/emails/{i}.md", f"mail {i}") for i in range(3)]
+    assert requests_mock.call_count == 2
+    # L'archive a rempli le cache : relecture sans réseau
+    assert github.get_file("MH/emails/1.md") == "mail 1"
+    assert requests_mock.call_count == 2
+
+
+def test_archive_skips_unrequested_members_and_reports_decode_errors(github, requests_mock):
+    members = {f"MH/emails/{i}.md": f"mail {i}".encode("utf-8") for i in range(2)}
+    members["MH/emails/bad.md"] = "réunion".encode("latin-1")
+    members["MH/emails/logo.png"] = b"\x89PNG\r\n\x1a\n\xff\xfe"
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, data in members.items():
+            info = tarfile.TarInfo(f"owner-content-abc123/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    requests_mock.get(f"{REPO_URL}/git/trees/main:MH/emails", json={"sha": "t", "tree": [
+        {"path": path.rsplit("/", 1)[-1], "type": "blob", "sha": git_blob_sha(data), "size": len(data)}
+        for path, data in members.items()
+    ]})
+    requests_mock.get(f"{REPO_URL}/tarball/main", content=buffer.getvalue())
+    github.snapshot_threshold = 2
+
+    results = {path: (content, error) for path, content, error in github.read_prefixes(["MH/emails"], ".md")}
+
+    assert sorted(results) == ["MH/emails/0.md", "MH/emails/1.md", "MH/emails/bad.md"]
+    assert results["MH/emails/1.md"] == ("mail 1", None)
+    assert isinstance(results["MH/emails/bad.md"][1], UnicodeDecodeError)
+    assert github.metrics["downloads"] == 3
+    assert requests_mock.call_count == 2
+
+
+def test_large_file_streamed_without_base64(github, requests_mock):
+    body = ("ligne de transcription\n" * 100_000).encode("utf-8")
+    requests_mock.get(f"{REPO_URL}/contents/MH/transcriptions/long.md", content=body)
+
+    assert github.get_file("MH/transcriptions/long.md").encode("utf-8") == body
+    assert github._known_shas["MH/transcriptions/long.md"] == git_blob_sha(body)
+    assert b"".join(github.stream_file("MH/transcriptions/long.md", chunk_size=1024)) == body
+
+
+def test_identical_writes_are_skipped(github, requests_mock):
+    url = f"{REPO_URL}/contents/MH/index.json"
+    requests_mock.get(url, json={"sha": git_blob_sha(b"[]")})
+    requests_mock.put(url, json={"content": {"sha": "new"}})
+
+    assert github.upload_file("MH/index.json", "[]", commit_message="Index")["skipped"]
+    # Second appel : SHA distant désormais connu, aucun appel réseau
+    assert github.upload_file("MH/index.json", "[]", commit_message="Index")["skipped"]
+    assert requests_mock.call_count == 1
+    assert github.metrics["skipped_writes"] == 2
+
+    with github.batch(commit_message="Lot"):
+        github.upload_file("MH/index.json", "[]", commit_message="ignoré")
+    assert requests_mock.call_count == 1
+    assert github.metrics["skipped_writes"] == 3
+
+
+def test_commit_skipped_when_tree_unchanged(github, requests_mock):
+    mock_git_data_api(requests_mock)
+    requests_mock.post(f"{REPO_URL}/git/trees", json={"sha": "base-tree"})
+
+    assert github.upload_files({"MH/backlog.json": "[]"}, commit_message="Backlog") is None
+    assert requests_mock.call_count == 3
+    assert github.metrics["skipped_writes"] == 1
+
+
+def test_get_file_revalidates_once_known_sha_is_stale(github, requests_mock):
+    url = f"{REPO_URL}/contents/MH/index/manifest.json"
+    requests_mock.get(url, [
+        {"status_code": 200, "text": "v1", "headers": {"ETag": '"etag-1"'}},
+        {"status_code": 200, "text": "v2", "headers": {"ETag": '"etag-2"'}},
+    ])
+    github.known_sha_ttl = 0
+
+    assert github.get_file("MH/index/manifest.json") == "v1"
+    # Client de longue durée (st.cache_resource) : le fichier a changé sur la branche
+    assert github.get_file("MH/index/manifest.json") == "v2"
+    assert requests_mock.call_count == 2
+    assert requests_mock.last_request.headers["If-None-Match"] == '"etag-1"'
+
+
+def test_etags_saved_once_per_batch_of_reads(github, requests_mock, monkeypatch):
+    for i in range(10):
+        requests_mock.get(f"{REPO_URL}/contents/MH/emails/{i}.md", text=f"mail {i}", headers={"ETag": f'"e{i}"'})
+    saves = []
+    original_save = github._save_etags
+    monkeypatch.setattr(github, "_save_etags", lambda: saves.append(1) or original_save())
+
+    results = list(github.get_files([f"MH/emails/{i}.md" for i in range(10)], strategy="rest"))
+
+    assert len(results) == 10 and len(saves) == 1
+    assert len(GitHubClient()._etags) == 10
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from clients.github_session import GitHubSession
+
+URL = "https://api.github.com/repos/owner/content/contents/MH/index.json"
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def session(sleeps):
+    return GitHubSession(headers={"Authorization": "Bearer fake"}, sleep=sleeps.append, min_write_interval=0)
+
+
+def test_retries_server_errors_then_succeeds(session, sleeps, requests_mock):
+    requests_mock.get(URL, [
+        {"status_code": 502},
+        {"status_code": 503},
+        {"status_code": 200, "json": {"ok": True}},
+    ])
+
+    response = session.get(URL)
+
+    assert response.json() == {"ok": True}
+    assert len(sleeps) == 2
+    assert session.metrics["retries"] == 2
+    assert requests_mock.last_request.headers["Authorization"] == "Bearer fake"
+
+
+def test_honors_retry_after_on_secondary_rate_limit(session, sleeps, requests_mock):
+    requests_mock.put(URL, [
+        {"status_code": 403, "headers": {"Retry-After": "7"}, "text": "secondary rate limit"},
+        {"status_code": 201, "json": {}},
+    ])
+
+    assert session.put(URL, json={}).status_code == 201
+    assert sleeps == [7.0]
+
+
+def test_plain_forbidden_is_not_retried(session, sleeps, requests_mock):
+    requests_mock.get(URL, status_code=403, text="Resource not accessible by integration")
+
+    assert session.get(URL).status_code == 403
+    assert sleeps == []
+
+
+def test_slows_down_when_quota_is_low(session, sleeps, requests_mock):
+    reset = time.time() + 100
+    requests_mock.get(URL, status_code=200, headers={
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": "10",
+        "X-RateLimit-Reset": str(reset),
+    })
+
+    session.get(URL)
+    assert sleeps == []
+    session.get(URL)
+    # 10 requêtes restantes pour ~100 s : environ 10 s entre deux requêtes
+    assert len(sleeps) == 1 and 9 < sleeps[0] <= 10
+
+
+def test_spaces_write_requests(sleeps, requests_mock):
+    session = GitHubSession(sleep=sleeps.append, min_write_interval=1.0)
+    requests_mock.post(URL, status_code=201, json={})
+
+    session.post(URL)
+    session.post(URL)
+
+    assert len(sleeps) == 1 and 0 < sleeps[0] <= 1.0
+
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+
+def test_graphql_reads_have_their_own_budget_and_no_write_spacing(sleeps, requests_mock):
+    session = GitHubSession(sleep=sleeps.append, min_write_interval=1.0)
+    reset = time.time() + 100
+    requests_mock.post(GRAPHQL_URL, status_code=200, json={"data": {}}, headers={
+        "X-RateLimit-Resource": "graphql",
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": "4990",
+        "X-RateLimit-Reset": str(reset),
+    })
+    requests_mock.get(URL, status_code=200, headers={
+        "X-RateLimit-Resource": "core",
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": "10",
+        "X-RateLimit-Reset": str(reset),
+    })
+
+    session.get(URL)
+    session.post(GRAPHQL_URL, json={"query": "{}"})
+    session.post(GRAPHQL_URL, json={"query": "{}"})
+
+    # Ni espacement d'écriture, ni ralentissement dû au quota REST presque épuisé
+    assert sleeps == []
+    assert session.rate_limit["remaining"] == 10
+    assert session.rate_limits["graphql"]["remaining"] == 4990
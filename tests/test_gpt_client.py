@@ -2,9 +2,20 @@ import os
 import pytest
 import requests
 import sys
+import threading
+import time
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'clients')))
-from gpt_client import GPTClient  # adapte le nom du fichier/module si nécessaire
+from utils.disk_cache import DiskCache
+from gpt_client import GPTClient, shared_session  # adapte le nom du fichier/module si nécessaire
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # Les retries ne doivent pas ralentir les tests, et le cache disque ne doit pas les influencer
+    monkeypatch.setattr(shared_session(), "sleep", lambda seconds: None)
+    monkeypatch.setenv("OPENAI_CACHE", "0")
 
 # On utilise requests-mock pour éviter les appels réels à l'API
 def test_complete_success(requests_mock):
@@ -55,3 +66,163 @@ def test_missing_api_key(monkeypatch):
 
     with pytest.raises(ValueError, match="Veuillez définir OPENAI_API_KEY"):
         GPTClient()
+
+
+def test_complete_retries_rate_limit_with_retry_after(requests_mock):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+    requests_mock.post(mock_url, [
+        {"status_code": 429, "headers": {"Retry-After": "2"}, "text": "rate limited"},
+        {"status_code": 503, "text": "indisponible"},
+        {"json": {"choices": [{"message": {"content": "ok"}}]}, "status_code": 200},
+    ])
+    waits = []
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o")
+    client.http.sleep = waits.append
+
+    assert client.complete(prompt="Bonjour") == "ok"
+    assert requests_mock.call_count == 3
+    assert waits[0] == 2.0
+
+
+def test_complete_does_not_retry_client_errors(requests_mock):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+    requests_mock.post(mock_url, [
+        {"status_code": 429, "text": '{"error": {"code": "insufficient_quota"}}'},
+        {"status_code": 400, "text": "requête invalide"},
+    ])
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o")
+
+    with pytest.raises(RuntimeError, match="Erreur HTTP GPT"):
+        client.complete(prompt="Quota")
+    with pytest.raises(RuntimeError, match="Erreur HTTP GPT"):
+        client.complete(prompt="Invalide")
+    assert requests_mock.call_count == 2
+
+
+def test_complete_stops_retrying_at_deadline(requests_mock):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+    requests_mock.post(mock_url, status_code=503, headers={"Retry-After": "30"}, text="indisponible")
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o")
+
+    # L'attente demandée (30 s) dépasse l'échéance de l'appel (5 s) : pas de nouvelle tentative
+    with pytest.raises(RuntimeError, match="Erreur HTTP GPT"):
+        client.complete(prompt="Échéance", timeout=5)
+    assert requests_mock.call_count == 1
+
+
+def test_limiter_wait_does_not_count_against_deadline(requests_mock, monkeypatch):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+    requests_mock.post(mock_url, json={"choices": [{"message": {"content": "réponse"}}]})
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    class ThrottledLimiter:
+        def acquire(self, tokens):
+            now[0] += 40  # Attente locale RPM / TPM bien plus longue que l'échéance
+            return 40.0
+
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o", limiter=ThrottledLimiter())
+
+    assert client.complete(prompt="Étranglé", timeout=5, use_cache=False) == "réponse"
+    assert requests_mock.call_count == 1
+
+
+def test_complete_serves_identical_requests_from_cache(requests_mock, tmp_path):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+    requests_mock.post(mock_url, json={"choices": [{"message": {"content": "réponse"}}]})
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o", cache=DiskCache(str(tmp_path)))
+
+    assert client.complete(prompt="Bonjour") == "réponse"
+    assert client.complete(prompt="Bonjour") == "réponse"
+    # Autre température ou autre version de prompt : nouvelle requête
+    client.complete(prompt="Bonjour", temperature=0.9)
+    client.complete(prompt="Bonjour", prompt_version="2")
+
+    assert requests_mock.call_count == 3
+    assert client.metrics == {"cache_hits": 1, "cache_misses": 3}
+
+
+def test_complete_many_keeps_order_and_isolates_errors(requests_mock):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+
+    def answer(request, context):
+        prompt = request.json()["messages"][1]["content"]
+        if prompt == "erreur":
+            context.status_code = 400
+            return {"error": "invalide"}
+        return {"choices": [{"message": {"content": prompt.upper()}}]}
+
+    requests_mock.post(mock_url, json=answer)
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o")
+
+    results = list(client.complete_many(["a", "erreur", None, {"prompt": "b", "max_tokens": 10}], max_workers=2))
+
+    assert [(position, content) for position, content, _ in results] == [(0, "A"), (1, None), (2, ""), (3, "B")]
+    assert isinstance(results[1][2], RuntimeError)
+    assert requests_mock.call_count == 3
+
+
+def test_stream_yields_deltas_and_caches_full_answer(requests_mock, tmp_path):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+    events = (
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "Bonjour "}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "à tous"}}]}\n\n'
+        'data: [DONE]\n\n'
+    )
+    requests_mock.post(mock_url, content=events.encode("utf-8"), headers={"Content-Type": "text/event-stream"})
+
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o", cache=DiskCache(str(tmp_path)))
+
+    assert list(client.stream(prompt="Salut")) == ["Bonjour ", "à tous"]
+    assert requests_mock.last_request.json()["stream"] is True
+    # Réponse complète mise en cache : servie d'un bloc, sans nouvel appel
+    assert list(client.stream(prompt="Salut")) == ["Bonjour à tous"]
+    assert client.complete(prompt="Salut") == "Bonjour à tous"
+    assert requests_mock.call_count == 1
+
+
+def test_map_reduce_processes_chunks_and_merges(requests_mock):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+
+    def answer(request, context):
+        prompt = request.json()["messages"][1]["content"]
+        content = "fusion" if prompt.startswith("Fusionne") else f"partiel {prompt.count('mot')}"
+        return {"choices": [{"message": {"content": content}}]}
+
+    requests_mock.post(mock_url, json=answer)
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o")
+    text = "\n\n".join("mot " * 30 for _ in range(4))
+
+    result = client.map_reduce(
+        text,
+        map_request=lambda chunk: f"Analyse : {chunk}",
+        reduce_request=lambda partials: "Fusionne : " + " | ".join(partials),
+        chunk_tokens=40
+    )
+
+    assert result == "fusion"
+    prompts = [r.json()["messages"][1]["content"] for r in requests_mock.request_history]
+    assert prompts[-1] == "Fusionne : " + " | ".join(["partiel 30"] * 4)
+    # Texte court : un seul appel, sans fusion
+    assert client.map_reduce("mot", lambda chunk: chunk, lambda partials: "Fusionne") == "partiel 1"
+
+
+def test_long_summary_task_runs_in_calling_worker(requests_mock, monkeypatch):
+    mock_url = "https://api.openai.com/v1/chat/completions"
+    threads = set()
+
+    def answer(request, context):
+        threads.add(threading.current_thread().name)
+        return {"choices": [{"message": {"content": "résumé"}}]}
+
+    requests_mock.post(mock_url, json=answer)
+    client = GPTClient(api_key="fake_api_key", model="gpt-4o")
+    client.chunk_tokens = 40
+    body = "\n\n".join("mot " * 30 for _ in range(4))
+
+    results = list(client.complete_many([client.summary_task(body)], max_workers=2))
+
+    assert results == [(0, "résumé", None)]
+    # Parties et fusion dans le même worker : pas de pool imbriqué dans complete_many
+    assert len(threads) == 1 and requests_mock.call_count == 5
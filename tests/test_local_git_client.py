@@ -0,0 +1,88 @@
+import os
+import sys
+import subprocess
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from clients.content_storage import ConflictError
+from clients.local_git_client import LocalGitClient
+from services.email_indexer import EmailIndexer
+
+
+def commit_count(storage):
+    result = subprocess.run(["git", "-C", storage.root, "rev-list", "--count", "HEAD"], capture_output=True, text=True)
+    return int(result.stdout.strip())
+
+
+def test_upload_read_list_delete(storage):
+    storage.upload_file("MH/emails/a.md", "# A", commit_message="Ajout A")
+
+    assert storage.get_file("MH/emails/a.md") == "# A"
+    assert storage.list_files("MH") == ["MH/emails/a.md"]
+    assert len(storage.get_file_shas("MH/emails")["MH/emails/a.md"]) == 40
+
+    storage.delete_file("MH/emails/a.md", commit_message="Suppression A")
+    with pytest.raises(FileNotFoundError):
+        storage.get_file("MH/emails/a.md")
+    assert commit_count(storage) == 2
+
+
+def test_batch_creates_single_commit(storage):
+    with storage.batch(commit_message="Lot"):
+        for i in range(5):
+            storage.upload_file(f"MH/emails/{i}.md", str(i), commit_message="ignoré")
+
+    assert commit_count(storage) == 1
+    assert len(storage.list_files("MH/emails")) == 5
+
+
+def test_email_indexer_runs_offline(storage):
+    storage.upload_file(
+        "MH/emails/2025-06-01_mail.md",
+        "---\nid: mail-1\nsubject: Budget\ndate: '2025-06-01 10:00:00'\nauthor: a@b.fr\nsummary: Résumé\n---\n\nCorps",
+        commit_message="Ajout email"
+    )
+
+    indexer = EmailIndexer(github=storage, context="MH")
+    indexer.run()
+
+    index = indexer.get_index()
+    assert [entry["id"] for entry in index] == ["mail-1"]
+    assert index[0]["file"] == "MH/emails/2025-06-01_mail.md"
+
+
+def test_conditional_commit_rejects_stale_sha(storage):
+    storage.upload_file("MH/index/manifest.json", "{}", commit_message="Index")
+    sha = storage.get_file_shas("MH/index")["MH/index/manifest.json"]
+
+    storage.commit_files({"MH/index/manifest.json": "{\"v\": 1}"}, "Écriture 1", expected_shas={"MH/index/manifest.json": sha})
+    with pytest.raises(ConflictError):
+        storage.commit_files({"MH/index/manifest.json": "{\"v\": 2}"}, "Écriture 2", expected_shas={"MH/index/manifest.json": sha})
+
+    assert storage.get_file("MH/index/manifest.json") == "{\"v\": 1}"
+    assert commit_count(storage) == 2
+
+
+def clone(remote, path):
+    subprocess.run(["git", "clone", "-q", "-b", "main", str(remote), str(path)], check=True)
+    subprocess.run(["git", "-C", str(path), "config", "user.email", "test@example.com"], check=True)
+    subprocess.run(["git", "-C", str(path), "config", "user.name", "Test"], check=True)
+    return LocalGitClient(repo_path=str(path), branch="main")
+
+
+def test_sync_conflict_aborts_rebase(storage, tmp_path):
+    storage.upload_file("MH/index/2025-06.jsonl", "{\"id\": \"a\"}\n", commit_message="Index")
+    remote = tmp_path / "remote.git"
+    subprocess.run(["git", "clone", "-q", "--bare", storage.root, str(remote)], check=True)
+    first, second = clone(remote, tmp_path / "first"), clone(remote, tmp_path / "second")
+
+    first.upload_file("MH/index/2025-06.jsonl", "{\"id\": \"b\"}\n", commit_message="Index b")
+    first.sync()
+    second.upload_file("MH/index/2025-06.jsonl", "{\"id\": \"c\"}\n", commit_message="Index c")
+    with pytest.raises(ConflictError):
+        second.sync()
+
+    # Rebase annulé : la copie reste sur son propre commit et accepte de nouvelles écritures
+    assert not second._rebase_in_progress()
+    assert second.get_file("MH/index/2025-06.jsonl") == "{\"id\": \"c\"}\n"
+    second.upload_file("MH/emails/a.md", "# A", commit_message="Ajout A")
@@ -0,0 +1,94 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data.metadata_store import MetadataStore
+from services.email_indexer import EmailIndexer
+from services.metadata_sync import MetadataSync
+
+
+def entry(entry_id, day, author="a@b.fr", status="en_cours", title="Sujet"):
+    return {
+        "id": entry_id, "type": "email", "title": title, "date": f"{day} 09:00:00", "author": author,
+        "recipients": ["c@d.fr"], "context": "MH", "status": status,
+        "file": f"MH/emails/{entry_id}.md", "summary": f"Résumé {entry_id}"
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetadataStore(str(tmp_path / "metadata.db"))
+    yield store
+    store.close()
+
+
+def test_query_and_full_text_search(store):
+    store.upsert([
+        entry("a", "2025-05-02", title="Réunion budget"),
+        entry("b", "2025-06-03", author="x@y.fr", status="archive", title="Planning"),
+        entry("c", "2025-06-10", title="Divers"),
+    ], bodies={"c": "Le budget prévisionnel est validé"})
+
+    assert [e["id"] for e in store.query()] == ["c", "b", "a"]
+    assert [e["id"] for e in store.query(since="2025-06-01", until="2025-06-03")] == ["b"]
+    assert [e["id"] for e in store.query(author="x@y.fr")] == ["b"]
+    assert [e["id"] for e in store.query(include_archived=False)] == ["c", "a"]
+    # Préfixes, accents ignorés, corps inclus
+    assert sorted(e["id"] for e in store.search("budg")) == ["a", "c"]
+    assert [e["id"] for e in store.search("reunion")] == ["a"]
+    assert store.known_ids(["a", "z"]) == {"a"}
+
+
+def test_known_fingerprints(store):
+    store.upsert([{**entry("a", "2025-05-02"), "fingerprint": "f1"}, entry("b", "2025-05-03")])
+
+    assert store.known_fingerprints(["f1", "f2", None]) == {"f1"}
+
+
+def test_pending_changes_survive_remote_refresh(store):
+    store.upsert([entry("a", "2025-05-02")], local=False)
+    store.set_status(["a"], "archive")
+
+    # L’index distant n’a pas encore l’archivage : la modification locale est conservée
+    store.replace_remote([entry("a", "2025-05-02"), entry("b", "2025-05-03")])
+    assert store.get("a")["status"] == "archive"
+    pending = store.pending()
+    assert [(e["id"], version) for e, version in pending] == [("a", 1)]
+
+    store.mark_pushed({"a": 1})
+    assert store.pending() == []
+    store.replace_remote([entry("b", "2025-05-03")])
+    assert store.known_ids(["a", "b"]) == {"b"}
+
+
+def test_push_writes_pending_entries_to_index(store, storage):
+    indexer = EmailIndexer(github=storage, context="MH")
+    indexer.add_entries([entry("a", "2025-05-02")])
+
+    sync = MetadataSync(store, indexer)
+    assert sync.pull() == 1
+    store.set_status(["a"], "archive")
+    store.upsert([entry("b", "2025-06-03")])
+
+    assert sync.push() == 2
+    index = indexer.load_index()
+    assert index.get("a")["status"] == "archive"
+    assert "b" in index
+    assert store.pending() == []
+
+
+def test_pull_keeps_local_copy_when_index_is_unreadable(store, storage, monkeypatch):
+    indexer = EmailIndexer(github=storage, context="MH")
+    indexer.add_entries([entry("a", "2025-05-02"), entry("b", "2025-06-03")])
+    sync = MetadataSync(store, indexer)
+    assert sync.pull() == 2
+
+    def failing_get_files(paths):
+        for path in paths:
+            yield path, None, RuntimeError("503 Service Unavailable")
+
+    monkeypatch.setattr(storage, "get_files", failing_get_files)
+    with pytest.raises(RuntimeError):
+        sync.pull()
+    assert store.known_ids(["a", "b"]) == {"a", "b"}
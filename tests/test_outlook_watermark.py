@@ -0,0 +1,28 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from clients.outlook_watermark import WatermarkStore, is_before_watermark
+
+
+def test_watermarks_are_saved_per_account(tmp_path):
+    store = WatermarkStore(str(tmp_path / "cache" / "watermarks.json"))
+    assert store.load("MH") is None
+
+    store.save("MH", datetime(2025, 6, 1, 9, 30, 12, 500000), "E1")
+    store.save("HC", datetime(2025, 6, 2, 8, 0), "E2")
+
+    assert store.load("MH") == {"received_time": "2025-06-01 09:30:12", "entry_id": "E1"}
+    assert store.load("HC") == {"received_time": "2025-06-02 08:00:00", "entry_id": "E2"}
+    assert os.listdir(tmp_path / "cache") == ["watermarks.json"]
+
+
+def test_only_strictly_older_messages_are_skipped():
+    watermark = {"received_time": "2025-06-01 09:30:12", "entry_id": "E1"}
+
+    assert is_before_watermark(datetime(2025, 6, 1, 9, 30, 12), "E1", watermark)
+    assert is_before_watermark(datetime(2025, 6, 1, 9, 30, 11), "E0", watermark)
+    # Même seconde, autre message : retraité
+    assert not is_before_watermark(datetime(2025, 6, 1, 9, 30, 12, 800000), "E2", watermark)
+    assert not is_before_watermark(datetime(2025, 6, 1, 9, 30, 13), "E3", watermark)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.rate_limiter import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_bucket_allows_burst_then_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire(60) == 0.0
+    # Plus de réserve : 1 jeton par seconde
+    assert bucket.acquire(3) == 3.0
+    assert clock.now == 3.0
+
+
+def test_limiter_enforces_token_budget():
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=1000, tpm=600, clock=clock, sleep=clock.sleep)
+
+    limiter.acquire(500)
+    waited = limiter.acquire(200)
+
+    # 100 tokens manquants à 10 tokens/s
+    assert round(waited, 6) == 10.0
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.text_chunker import estimate_tokens, group_by_tokens, split_text
+
+
+def test_short_text_is_a_single_chunk():
+    assert split_text("  Bonjour.  ", max_tokens=100) == ["Bonjour."]
+    assert split_text("   ", max_tokens=100) == []
+
+
+def test_splits_on_speaker_turns_within_budget():
+    turns = [f"0:{i:02d} - Intervenant {i}\nRéplique numéro {i} " + "bla " * 20 for i in range(20)]
+    text = "\n".join(turns)
+
+    chunks = split_text(text, max_tokens=80)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 80 for chunk in chunks)
+    # Aucun tour de parole coupé, tous présents et dans l’ordre
+    assert "\n\n".join(chunks) == "\n\n".join(turn.strip() for turn in turns)
+
+
+def test_long_paragraph_falls_back_to_sentences_then_hard_cut():
+    sentence = "Une phrase assez longue pour remplir le bloc. "
+    chunks = split_text(sentence * 30 + "x" * 1000, max_tokens=50)
+
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert chunks[0].startswith("Une phrase") and chunks[0].endswith(".")
+    assert "".join(chunks).count("x") == 1000
+
+
+def test_group_by_tokens_keeps_order():
+    assert group_by_tokens(["a" * 40, "b" * 40, "c" * 40], max_tokens=25) == [["a" * 40, "b" * 40], ["c" * 40]]
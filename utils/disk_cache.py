@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+
+
+class DiskCache:
+    """
+    Cache disque clé -> octets, borné en taille avec éviction LRU.
+    Chaque entrée est un fichier `directory/ab/cdef...` ; la date de modification sert à
+    l'expiration (TTL), la date d'accès (mise à jour à chaque lecture) à l'ordre LRU.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 200 * 1024 * 1024, ttl: float = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(os.path.getsize(p) for p in self._entries())
+
+    def get(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            now = time.time()
+            if self.ttl is not None and now - stat.st_mtime > self.ttl:
+                self._remove(path, stat.st_size)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, (now, stat.st_mtime))
+            return data
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def set(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        self._commit(tmp_path, path)
+
+    def put_file(self, key: str, src_path: str) -> str:
+        """Déplace un fichier déjà écrit sur disque (même système de fichiers) dans le cache."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._commit(src_path, path)
+        return path
+
+    def delete(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            if os.path.exists(path):
+                self._remove(path, os.path.getsize(path))
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _commit(self, tmp_path: str, path: str):
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.replace(tmp_path, path)
+            self._size += os.path.getsize(path)
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+
+    def _evict(self, keep: str):
+        # On descend sous 90 % de la limite pour ne pas évincer à chaque écriture
+        target = self.max_bytes * 0.9
+        entries = sorted((os.stat(p).st_atime, p) for p in self._entries() if p != keep)
+        for _, path in entries:
+            if self._size <= target:
+                break
+            self._remove(path, os.path.getsize(path))
+
+    def _remove(self, path: str, size: int):
+        os.remove(path)
+        self._size -= size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def _entries(self):
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir() or len(bucket.name) != 2:
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    yield entry.path
@@ -0,0 +1,141 @@
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ResilientSession:
+    """
+    Session HTTP partagée : pool de connexions keep-alive, retries sur erreurs transitoires
+    avec backoff exponentiel et jitter, prise en compte de l'en-tête Retry-After.
+    """
+
+    def __init__(
+        self,
+        headers: dict = None,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        pool_size: int = 10,
+        timeout: float = 30.0,
+        sleep=time.sleep
+    ):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.sleep = sleep
+        self.metrics = {"requests": 0, "retries": 0, "throttled_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, deadline: float = None, **kwargs) -> requests.Response:
+        """
+        deadline : instant limite (time.monotonic()) pour l'ensemble de l'appel, tentatives et
+        attentes comprises. Chaque tentative reçoit au plus le temps restant, et on ne réessaie
+        pas si l'attente avant la tentative suivante dépasserait l'échéance.
+        """
+        timeout = kwargs.pop("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self._wait(self._delay_before_request(method, url))
+            self._count("requests")
+            try:
+                response = self.session.request(method, url, timeout=self._attempt_timeout(timeout, deadline), **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or not self._fits(delay, deadline):
+                    raise
+                self._retry(delay)
+                attempt += 1
+                continue
+
+            self._after_response(method, url, response)
+            delay = self._retry_delay(response, attempt)
+            if delay is None or attempt >= self.max_retries or not self._fits(delay, deadline):
+                return response
+            response.close()
+            self._retry(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    # --- Points d'extension ---
+
+    def _delay_before_request(self, method: str, url: str) -> float:
+        return 0.0
+
+    def _after_response(self, method: str, url: str, response: requests.Response):
+        pass
+
+    def _retry_delay(self, response: requests.Response, attempt: int):
+        if response.status_code not in RETRY_STATUSES:
+            return None
+        return self._retry_after(response) or self._backoff(attempt)
+
+    # --- Utilitaires ---
+
+    @staticmethod
+    def _attempt_timeout(timeout, deadline: float):
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout("Échéance dépassée avant la requête")
+        return remaining if timeout is None else min(timeout, remaining)
+
+    @staticmethod
+    def _fits(delay: float, deadline: float) -> bool:
+        return deadline is None or time.monotonic() + delay < deadline
+
+    def _backoff(self, attempt: int) -> float:
+        # « Full jitter » : évite que des clients parallèles réessaient tous au même instant
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(response: requests.Response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+    def _retry(self, delay: float):
+        self._count("retries")
+        self._wait(delay)
+
+    def _wait(self, delay: float):
+        if delay and delay > 0:
+            with self._lock:
+                self.metrics["throttled_seconds"] += delay
+            self.sleep(delay)
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.metrics[name] = self.metrics.get(name, 0) + value
@@ -0,0 +1,48 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Seau à jetons : `per_minute` jetons par minute, rechargés en continu, au plus `capacity`
+    en réserve. acquire() bloque jusqu'à ce que la quantité demandée soit disponible.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Prélève `amount` jetons (plafonné à la capacité) ; retourne le temps d'attente total."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """Limites combinées de l'API : requêtes par minute (RPM) et tokens par minute (TPM)."""
+
+    def __init__(self, rpm: float, tpm: float, clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(rpm, clock=clock, sleep=sleep)
+        self.tokens = TokenBucket(tpm, clock=clock, sleep=sleep)
+
+    def acquire(self, tokens: int) -> float:
+        return self.requests.acquire(1) + self.tokens.acquire(tokens)
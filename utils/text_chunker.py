@@ -0,0 +1,74 @@
+import re
+
+# Début d'un tour de parole dans une transcription : « Jean Dupont : », « [00:12:03] Jean : »,
+# « 0:12 - Jean Dupont » (Fathom)
+SPEAKER_TURN = re.compile(
+    r"^(?:\[?\d{1,2}:\d{2}(?::\d{2})?\]?\s*(?:[-–]\s*)?\S|[^\s:][^:\n]{0,40}\s?:\s)",
+    re.MULTILINE
+)
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    # Approximation usuelle : ~4 caractères par token
+    return len(text or "") // 4 + 1
+
+
+def split_text(text: str, max_tokens: int) -> list[str]:
+    """
+    Découpe un texte en blocs d'au plus `max_tokens` tokens (estimés), en coupant de préférence
+    entre paragraphes ou tours de parole, à défaut entre phrases, en dernier recours au milieu
+    d'une phrase. Les blocs sont aussi remplis que possible et restent dans l'ordre du texte.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    units = []
+    for block in _blocks(text):
+        if estimate_tokens(block) <= max_tokens:
+            units.append(block)
+            continue
+        sentences = []
+        for sentence in SENTENCE_END.split(block):
+            if estimate_tokens(sentence) <= max_tokens:
+                sentences.append(sentence)
+            else:
+                sentences.extend(_hard_split(sentence, max_tokens))
+        units.extend(" ".join(group) for group in group_by_tokens(sentences, max_tokens, separator=" "))
+    return ["\n\n".join(group) for group in group_by_tokens(units, max_tokens)]
+
+
+def group_by_tokens(texts: list[str], max_tokens: int, separator: str = "\n\n") -> list[list[str]]:
+    """Regroupe des textes consécutifs tant que leur concaténation tient dans `max_tokens`."""
+    groups, current, size = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text + separator)
+        if current and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _blocks(text: str) -> list[str]:
+    """Paragraphes, eux-mêmes coupés avant chaque tour de parole."""
+    blocks = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        starts = [match.start() for match in SPEAKER_TURN.finditer(paragraph)]
+        bounds = sorted({0, *starts, len(paragraph)})
+        for start, end in zip(bounds, bounds[1:]):
+            block = paragraph[start:end].strip()
+            if block:
+                blocks.append(block)
+    return blocks
+
+
+def _hard_split(text: str, max_tokens: int) -> list[str]:
+    size = max(1, (max_tokens - 1) * 4)
+    return [text[start:start + size] for start in range(0, len(text), size)]